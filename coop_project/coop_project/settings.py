@@ -148,6 +148,110 @@ SNOW_INSTANCE_URL = config("SNOW_INSTANCE_URL", default="")
 SNOW_USERNAME = config("SNOW_USERNAME", default="")
 SNOW_PASSWORD = config("SNOW_PASSWORD", default="")
 SNOW_APP_TABLE = config("SNOW_APP_TABLE", default="cmdb_ci_service")
+# Records per Table API page, and how many pages to fetch at once. Page
+# offsets advance by SNOW_PAGE_SIZE, so keep it within the instance's
+# per-request row cap or the capped-off rows are skipped.
+SNOW_PAGE_SIZE = config("SNOW_PAGE_SIZE", default=1000, cast=int)
+SNOW_MAX_CONCURRENCY = config("SNOW_MAX_CONCURRENCY", default=4, cast=int)
+# Mapped fields take display values: "true" (choice labels, reference names)
+# or "false" (raw values). Watermarks always use the raw UTC values.
+SNOW_DISPLAY_VALUE = config("SNOW_DISPLAY_VALUE", default="true")
+# CriticalApplication field -> ServiceNow columns, e.g.
+# {"name": ("name", "u_application_name"), "rto": ("u_rto",), ...}.
+# None uses DEFAULT_FIELD_MAP in the ServiceNow integration.
+SNOW_FIELD_MAP = None
+# HTTP session pooling, retries (429/5xx, with backoff + jitter, honouring
+# Retry-After) and client-side rate limiting (requests/second, 0 = unlimited).
+SNOW_TIMEOUT = config("SNOW_TIMEOUT", default=30, cast=int)
+SNOW_POOL_SIZE = config("SNOW_POOL_SIZE", default=10, cast=int)
+SNOW_MAX_RETRIES = config("SNOW_MAX_RETRIES", default=5, cast=int)
+SNOW_BACKOFF_BASE = config("SNOW_BACKOFF_BASE", default=0.5, cast=float)
+SNOW_BACKOFF_MAX = config("SNOW_BACKOFF_MAX", default=60, cast=float)
+SNOW_RATE_LIMIT = config("SNOW_RATE_LIMIT", default=0, cast=float)
+SNOW_RATE_BURST = config("SNOW_RATE_BURST", default=5, cast=int)
+# Rows per bulk_create/bulk_update statement when applying a sync.
+SNOW_BULK_BATCH_SIZE = config("SNOW_BULK_BATCH_SIZE", default=500, cast=int)
+# Records parsed from the response stream before each batch is applied.
+SNOW_SYNC_BATCH_SIZE = config("SNOW_SYNC_BATCH_SIZE", default=1000, cast=int)
+# Syncs fetch only records changed since each division's sys_updated_on/sys_id
+# watermark; a full sync (which also removes deleted applications) runs at
+# least this often. The watermark is ServiceNow's raw (UTC, yyyy-MM-dd HH:mm:ss)
+# sys_updated_on, whatever the integration user's date format and timezone.
+SNOW_FULL_SYNC_INTERVAL_HOURS = config("SNOW_FULL_SYNC_INTERVAL_HOURS", default=168, cast=int)
+# Divisions synced at once by the sync_servicenow command.
+SNOW_SYNC_WORKERS = config("SNOW_SYNC_WORKERS", default=4, cast=int)
+
+# ----------------------------------------------------------------
+# COOP plan generation (DBOS background jobs)
+# ----------------------------------------------------------------
+# Required once a job is queued; there is no local fallback database.
+DBOS_SYSTEM_DATABASE_URL = config("DBOS_SYSTEM_DATABASE_URL", default="")
+# Jobs run under `manage.py run_plan_worker`. Set this only to have the web
+# process run them as well (single-process deployments).
+COOP_PLAN_WORKER_ENABLED = config("COOP_PLAN_WORKER_ENABLED", default=False, cast=bool)
+COOP_PLAN_WORKER_CONCURRENCY = config("COOP_PLAN_WORKER_CONCURRENCY", default=2, cast=int)
+COOP_PDF_CONVERSION_CONCURRENCY = config("COOP_PDF_CONVERSION_CONCURRENCY", default=2, cast=int)
+# Durable ServiceNow division syncs running at once, across all workers.
+SNOW_SYNC_QUEUE_CONCURRENCY = config("SNOW_SYNC_QUEUE_CONCURRENCY", default=4, cast=int)
+# Optional organization .docx used as the base of every plan (styles, cover, branding)
+COOP_PLAN_TEMPLATE_PATH = config("COOP_PLAN_TEMPLATE_PATH", default="")
+# Hand plan downloads to the front-end server: "", "x-sendfile" or "x-accel-redirect"
+COOP_PLAN_DOWNLOAD_OFFLOAD = config("COOP_PLAN_DOWNLOAD_OFFLOAD", default="")
+COOP_PLAN_ACCEL_REDIRECT_PREFIX = config("COOP_PLAN_ACCEL_REDIRECT_PREFIX", default="/protected-media/")
+# Retention for GeneratedPlan history (enforced by `manage.py prune_coop_plans`)
+COOP_PLAN_RETENTION_KEEP_LAST = config("COOP_PLAN_RETENTION_KEEP_LAST", default=10, cast=int)
+COOP_PLAN_RETENTION_KEEP_APPROVED = config("COOP_PLAN_RETENTION_KEEP_APPROVED", default=True, cast=bool)
+COOP_PLAN_RETENTION_KEEP_MONTHLY = config("COOP_PLAN_RETENTION_KEEP_MONTHLY", default=True, cast=bool)
+
+# Persistent headless office converters (unoserver). 0 = spawn LibreOffice per plan.
+COOP_PDF_POOL_SIZE = config("COOP_PDF_POOL_SIZE", default=0, cast=int)
+COOP_PDF_POOL_BASE_PORT = config("COOP_PDF_POOL_BASE_PORT", default=2003, cast=int)
+COOP_PDF_CONVERSION_TIMEOUT = config("COOP_PDF_CONVERSION_TIMEOUT", default=60, cast=int)
+COOP_PDF_CONVERTER_STARTUP_TIMEOUT = config("COOP_PDF_CONVERTER_STARTUP_TIMEOUT", default=30, cast=int)
+COOP_PDF_CONVERTER_COMMAND = config("COOP_PDF_CONVERTER_COMMAND", default="unoserver")
+
+# ----------------------------------------------------------------
+# Permissions
+# ----------------------------------------------------------------
+# Seconds to cache each user's group names across requests (0 = per request
+# only). Membership changes clear the entry, but only in the cache backend
+# this process uses, so keep it short unless CACHES is shared.
+COOP_ROLE_CACHE_TTL = config("COOP_ROLE_CACHE_TTL", default=0, cast=int)
+
+# ----------------------------------------------------------------
+# Division list views
+# ----------------------------------------------------------------
+# Rows per page on the keyset-paginated essential function, application,
+# personnel, ... lists.
+COOP_LIST_PAGE_SIZE = config("COOP_LIST_PAGE_SIZE", default=50, cast=int)
+# Seconds each division's filter options stay cached. Saves and deletes clear
+# them (in this process's cache backend), so this only bounds staleness when
+# CACHES is not shared.
+COOP_LIST_FILTER_CACHE_TTL = config("COOP_LIST_FILTER_CACHE_TTL", default=300, cast=int)
+
+# ----------------------------------------------------------------
+# Leadership dashboard
+# ----------------------------------------------------------------
+# Seconds the dashboard payload stays cached. Saves and deletes clear it
+# (in this process's cache backend), as do plan generation and ServiceNow
+# syncs, so this only bounds staleness in other processes when CACHES is not
+# shared.
+COOP_DASHBOARD_CACHE_TTL = config("COOP_DASHBOARD_CACHE_TTL", default=300, cast=int)
+
+# ----------------------------------------------------------------
+# Query budgets (development / CI)
+# ----------------------------------------------------------------
+# Counts SQL per request, logs repeated query shapes (N+1 candidates) and
+# enforces per-view budgets (@query_budget(n) or COOP_QUERY_BUDGETS). The
+# division, list and dashboard views declare theirs in core/views.py.
+COOP_QUERY_BUDGET_ENABLED = config("COOP_QUERY_BUDGET_ENABLED", default=DEBUG, cast=bool)
+# Raise QueryBudgetExceeded instead of logging; turn on in CI so tests fail.
+COOP_QUERY_BUDGET_STRICT = config("COOP_QUERY_BUDGET_STRICT", default=False, cast=bool)
+COOP_QUERY_BUDGET_DEFAULT = config("COOP_QUERY_BUDGET_DEFAULT", default=None, cast=lambda v: int(v) if v else None)
+COOP_QUERY_BUDGETS = {}
+COOP_QUERY_NPLUSONE_THRESHOLD = config("COOP_QUERY_NPLUSONE_THRESHOLD", default=3, cast=int)
+if COOP_QUERY_BUDGET_ENABLED:
+    MIDDLEWARE.insert(0, "core.query_budget.QueryBudgetMiddleware")
 
 # ----------------------------------------------------------------
 # Logging
@@ -5,6 +5,7 @@ from .models import (
     VitalRecord, Dependency, AlternateFacility, Communication,
     RecoveryPriority, DivisionMetadata
 )
+from .permissions import is_admin, is_coordinator
 from .serializers import (
     DivisionSerializer, EssentialFunctionSerializer, CriticalApplicationSerializer,
     KeyPersonnelSerializer, VitalRecordSerializer, DependencySerializer,
@@ -26,10 +27,7 @@ class IsAdminOrReadOnly(permissions.BasePermission):
             # read-only allowed for any authenticated user
             return True
         # write operations: admin only
-        return (
-            request.user.is_superuser
-            or request.user.groups.filter(name="COOP Admins").exists()
-        )
+        return is_admin(request.user)
 
 
 class IsCoordinatorForDivision(permissions.BasePermission):
@@ -39,11 +37,11 @@ class IsCoordinatorForDivision(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
-        if request.user.is_superuser or request.user.groups.filter(name="COOP Admins").exists():
+        if is_admin(request.user):
             return True
-        if request.user.groups.filter(name="Coordinators").exists():
+        if is_coordinator(request.user):
             division = getattr(obj, "division", obj if isinstance(obj, Division) else None)
-            return division and division.coordinator == request.user
+            return division and division.coordinator_id == request.user.pk
         return False
 
 
@@ -0,0 +1,252 @@
+"""
+Keyset pagination, sorting and filtering for the division child-entity lists.
+
+Each list is sorted by a whitelisted column plus `id` as a tie-breaker, and
+pages are addressed by a cursor holding the (sort value, id) of the row at the
+page edge rather than an OFFSET. With the matching (division, column, id)
+index declared on the model, every page is an index range scan of page_size
+rows, however deep into the table it is. Filter columns are indexed the same
+way, and each division's filter options are cached (COOP_LIST_FILTER_CACHE_TTL)
+until one of its rows is saved or deleted, so no page load scans the table.
+
+Query string:
+    sort=<column> or sort=-<column>   one of the list's SORTS (default first)
+    <column>=<value>                  exact match on one of its FILTERS
+    q=<text>                          case-insensitive match on its SEARCH columns
+    after=<cursor> / before=<cursor>  next / previous page
+"""
+import base64
+import json
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import (
+    EssentialFunction, CriticalApplication, KeyPersonnel, VitalRecord,
+    Dependency, AlternateFacility, Communication, RecoveryPriority
+)
+
+
+FILTER_OPTIONS_CACHE_KEY = "coop:list-filters:{}:{}"
+
+
+@dataclass(frozen=True)
+class ListSpec:
+    # Sortable columns, default first, and filter columns. Each needs a
+    # (division, column, id) index in the model's Meta so sorted pages and
+    # option lists stay index scans.
+    sorts: tuple
+    filters: tuple = ()
+    search: tuple = ()
+
+
+LIST_SPECS = {
+    EssentialFunction: ListSpec(("name", "priority"), filters=("priority",), search=("name", "owner")),
+    CriticalApplication: ListSpec(
+        ("name", "recovery_tier"),
+        filters=("recovery_tier", "hosting_environment"),
+        search=("name", "vendor_contact"),
+    ),
+    KeyPersonnel: ListSpec(("name", "role"), filters=("primary_or_alternate",), search=("name", "role", "email")),
+    VitalRecord: ListSpec(("name", "priority"), filters=("record_type", "priority"), search=("name", "owner")),
+    Dependency: ListSpec(("name", "criticality"), filters=("dependency_type", "criticality"), search=("name",)),
+    AlternateFacility: ListSpec(("name",), filters=("facility_type", "it_availability"), search=("name", "contact")),
+    Communication: ListSpec(
+        ("communication_type",), filters=("method",), search=("communication_type", "primary_contact"),
+    ),
+    RecoveryPriority: ListSpec(("priority_level", "item_name"), filters=("item_type",), search=("item_name",)),
+}
+
+
+@dataclass
+class SortLink:
+    url: str
+    arrow: str = ""
+
+
+@dataclass
+class ListFilter:
+    name: str
+    label: str
+    value: str
+    options: list
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    sort: str
+    descending: bool
+    query: str
+    filters: list
+    sort_links: dict
+    next_url: str = ""
+    previous_url: str = ""
+    first_url: str = ""
+
+    @property
+    def sort_param(self):
+        return f"-{self.sort}" if self.descending else self.sort
+
+    @property
+    def filtered(self):
+        return bool(self.query or any(f.value for f in self.filters))
+
+
+def encode_cursor(value, pk):
+    raw = json.dumps([value, pk], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """(value, pk) from a cursor, or None if it is missing or malformed."""
+    if not token:
+        return None
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(pk, int) or not isinstance(value, (str, int)):
+        return None
+    return value, pk
+
+
+def _cursor(token, sort_field):
+    """A decoded cursor with its value cast to the sort column's type, or None."""
+    cursor = decode_cursor(token)
+    if cursor is None:
+        return None
+    try:
+        return sort_field.to_python(cursor[0]), cursor[1]
+    except ValidationError:
+        return None
+
+
+def _page_size():
+    return getattr(settings, "COOP_LIST_PAGE_SIZE", 50)
+
+
+def filter_options(model, division):
+    """{filter column: distinct non-blank values} for one division's rows, cached."""
+    key = FILTER_OPTIONS_CACHE_KEY.format(model._meta.label_lower, division.pk)
+    options = cache.get(key)
+    if options is None:
+        rows = model.objects.filter(division=division)
+        options = {
+            name: list(rows.exclude(**{name: ""}).order_by(name).values_list(name, flat=True).distinct())
+            for name in LIST_SPECS[model].filters
+        }
+        cache.set(key, options, getattr(settings, "COOP_LIST_FILTER_CACHE_TTL", 300))
+    return options
+
+
+def invalidate_filter_options(model, division_id):
+    """Drop a division's cached options once the current transaction (if any) commits."""
+    key = FILTER_OPTIONS_CACHE_KEY.format(model._meta.label_lower, division_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def _url(request, **params):
+    """The current list URL with the cursor replaced and `params` set."""
+    query = request.GET.copy()
+    for key in ("after", "before"):
+        query.pop(key, None)
+    for key, value in params.items():
+        if value:
+            query[key] = value
+        else:
+            query.pop(key, None)
+    encoded = query.urlencode()
+    return f"{request.path}?{encoded}" if encoded else request.path
+
+
+def _seek(column, value, pk, forward):
+    """Rows strictly after (value, pk) in the direction of travel."""
+    op = "gt" if forward else "lt"
+    return Q(**{f"{column}__{op}": value}) | Q(**{column: value, f"id__{op}": pk})
+
+
+def keyset_paginate(request, queryset, division):
+    """
+    One page of `queryset` (already narrowed to `division`) as a KeysetPage,
+    sorted, filtered and positioned from request.GET.
+    """
+    spec = LIST_SPECS[queryset.model]
+    model_fields = {f.name: f for f in queryset.model._meta.fields}
+
+    sort = request.GET.get("sort", "")
+    descending = sort.startswith("-")
+    sort = sort.lstrip("-")
+    if sort not in spec.sorts:
+        sort, descending = spec.sorts[0], False
+
+    filters = []
+    options = filter_options(queryset.model, division) if spec.filters else {}
+    for name in spec.filters:
+        value = request.GET.get(name, "")
+        if value:
+            queryset = queryset.filter(**{name: value})
+        filters.append(ListFilter(name, model_fields[name].verbose_name.capitalize(), value, options[name]))
+
+    text = request.GET.get("q", "").strip()
+    if text and spec.search:
+        match = Q()
+        for column in spec.search:
+            match |= Q(**{f"{column}__icontains": text})
+        queryset = queryset.filter(match)
+
+    after = _cursor(request.GET.get("after"), model_fields[sort])
+    before = None if after else _cursor(request.GET.get("before"), model_fields[sort])
+    # Walking backwards reads the index the other way and flips the rows after.
+    forward = before is None
+    ascending = forward != descending
+    cursor = after or before
+    if cursor:
+        queryset = queryset.filter(_seek(sort, *cursor, forward=ascending))
+    prefix = "" if ascending else "-"
+    size = _page_size()
+    rows = list(queryset.order_by(f"{prefix}{sort}", f"{prefix}id")[:size + 1])
+    more = len(rows) > size
+    rows = rows[:size]
+    if not forward:
+        rows.reverse()
+
+    has_next = more if forward else True
+    has_previous = more if not forward else after is not None
+    sort_links = {}
+    for column in spec.sorts:
+        flip = column == sort and not descending
+        sort_links[column] = SortLink(
+            _url(request, sort=f"-{column}" if flip else column),
+            ("▼" if descending else "▲") if column == sort else "",
+        )
+
+    page = KeysetPage(rows, sort, descending, text, filters, sort_links)
+    if cursor:
+        page.first_url = _url(request)
+    if rows and has_next:
+        last = rows[-1]
+        page.next_url = _url(request, after=encode_cursor(getattr(last, sort), last.pk))
+    if rows and has_previous:
+        first = rows[0]
+        page.previous_url = _url(request, before=encode_cursor(getattr(first, sort), first.pk))
+    return page
+
+
+@receiver([post_save, post_delete], sender=EssentialFunction)
+@receiver([post_save, post_delete], sender=CriticalApplication)
+@receiver([post_save, post_delete], sender=KeyPersonnel)
+@receiver([post_save, post_delete], sender=VitalRecord)
+@receiver([post_save, post_delete], sender=Dependency)
+@receiver([post_save, post_delete], sender=AlternateFacility)
+@receiver([post_save, post_delete], sender=Communication)
+@receiver([post_save, post_delete], sender=RecoveryPriority)
+def invalidate_filters_on_change(sender, instance, **kwargs):
+    """Saves and deletes can add or remove a division's filter options."""
+    invalidate_filter_options(sender, instance.division_id)
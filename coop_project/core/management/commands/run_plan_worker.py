@@ -0,0 +1,19 @@
+import threading
+
+from dbos import DBOS
+from django.core.management.base import BaseCommand
+from core.plan_workflows import launch_dbos
+
+
+class Command(BaseCommand):
+    help = "Run the DBOS queue worker for COOP plan generation. Runs until interrupted."
+
+    def handle(self, *args, **options):
+        launch_dbos(worker=True)
+        self.stdout.write(self.style.SUCCESS("Plan worker running; Ctrl+C to stop."))
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            DBOS.destroy()
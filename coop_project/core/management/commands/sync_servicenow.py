@@ -1,36 +1,143 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import close_old_connections
 from django.utils import timezone
-from core.models import Division, ServiceNowIntegrationConfig
-from core.integrations.servicenow import sync_critical_applications_from_servicenow
+from core.models import ServiceNowIntegrationConfig
+from core.integrations.servicenow import group_configs_for_sync, sync_config_group
+
+
+def _sync_group(configs, full):
+    """
+    Sync divisions that share one ServiceNow scan. Failures, including ones
+    recording the outcome, are returned as that division's error rather than
+    raised, so other divisions carry on.
+    """
+    started = time.monotonic()
+    try:
+        try:
+            results = sync_config_group(configs, full=full)
+        except Exception as exc:
+            results = [{"config": config, "summary": None, "error": str(exc)} for config in configs]
+        seconds = time.monotonic() - started
+        for result in results:
+            config = result["config"]
+            result["seconds"] = seconds
+            try:
+                if result["error"]:
+                    config.sync_notes = f"{timezone.now():%Y-%m-%d %H:%M} sync failed: {result['error']}"
+                    config.save(update_fields=["sync_notes"])
+                else:
+                    config.last_synced = timezone.now()
+                    config.sync_notes = ""
+                    config.save(update_fields=["last_synced", "sync_notes"])
+            except Exception as exc:
+                if result["error"]:
+                    result["error"] = f"{result['error']} (and saving sync notes failed: {exc})"
+                else:
+                    result["error"] = f"saving sync status failed: {exc}"
+        return results
+    finally:
+        close_old_connections()
 
 
 class Command(BaseCommand):
     help = "Sync Critical Applications from ServiceNow for all enabled divisions"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Re-read every record instead of changes since the last sync, "
+                 "and remove applications deleted in ServiceNow.",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=getattr(settings, "SNOW_SYNC_WORKERS", 4),
+            help="Divisions to sync at once",
+        )
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Sync every enabled division, even those synced within sync_frequency_hours",
+        )
+
     def handle(self, *args, **options):
-        configs = ServiceNowIntegrationConfig.objects.filter(enabled=True)
+        configs = list(
+            ServiceNowIntegrationConfig.objects.filter(enabled=True)
+            .select_related("division")
+            .order_by("division__name")
+        )
 
-        if not configs.exists():
+        if not configs:
             self.stdout.write(self.style.WARNING("No enabled ServiceNow integration configs found."))
             return
 
+        now = timezone.now()
+        due = []
         for config in configs:
-            division = config.division
-            self.stdout.write(f"Syncing ServiceNow apps for division: {division.name}")
-
-            summary = sync_critical_applications_from_servicenow(
-                division,
-                query=config.query or None,
+            fresh_until = (
+                config.last_synced + timedelta(hours=config.sync_frequency_hours)
+                if config.last_synced else None
             )
+            if not options["force"] and fresh_until and fresh_until > now:
+                self.stdout.write(f"  {config.division.name}: skipped (synced {config.last_synced:%Y-%m-%d %H:%M})")
+            else:
+                due.append(config)
+
+        if not due:
+            self.stdout.write(self.style.SUCCESS("All divisions are up to date."))
+            return
 
-            config.last_synced = timezone.now()
-            config.save(update_fields=["last_synced"])
+        # Divisions on the same instance with the same fetch query share a scan.
+        groups = group_configs_for_sync(due, full=options["full"])
+        workers = max(1, min(options["workers"], len(groups)))
+        self.stdout.write(
+            f"Syncing {len(due)} division(s) in {len(groups)} scan(s) with {workers} worker(s)."
+        )
 
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f"  {division.name}: "
-                    f"{summary['created']} created, "
-                    f"{summary['updated']} updated "
-                    f"(total {summary['total']})."
-                )
-            )
+        started = time.monotonic()
+        results = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_sync_group, group, options["full"]) for group in groups]
+            for future in as_completed(futures):
+                for result in future.result():
+                    results.append(result)
+                    name = result["config"].division.name
+                    if result["error"]:
+                        self.stdout.write(self.style.ERROR(f"  {name}: FAILED — {result['error']}"))
+                    else:
+                        self.stdout.write(self.style.SUCCESS(f"  {name}: done ({result['seconds']:.1f}s)"))
+        elapsed = time.monotonic() - started
+
+        self._print_table(results)
+
+        failed = sum(1 for r in results if r["error"])
+        summary = (
+            f"Done in {elapsed:.1f}s: "
+            f"{len(results) - failed} synced, {failed} failed, {len(configs) - len(due)} skipped."
+        )
+        self.stdout.write(self.style.ERROR(summary) if failed else self.style.SUCCESS(summary))
+
+    def _print_table(self, results):
+        header = ("Division", "Mode", "Fetched", "Created", "Updated", "Unchanged", "Deleted", "Seconds")
+        rows = []
+        for r in sorted(results, key=lambda r: r["seconds"], reverse=True):
+            s = r["summary"]
+            if s is None:
+                counts = ("FAILED", "-", "-", "-", "-", "-")
+            else:
+                counts = (s["mode"], s["total"], s["created"], s["updated"], s["unchanged"], s["deleted"])
+            rows.append((r["config"].division.name, *map(str, counts), f"{r['seconds']:.1f}"))
+
+        widths = [max(len(str(row[i])) for row in [header] + rows) for i in range(len(header))]
+        # Division name left-aligned, numbers right-aligned.
+        line = "  ".join(
+            f"{{:<{w}}}" if i == 0 else f"{{:>{w}}}" for i, w in enumerate(widths)
+        )
+        self.stdout.write("")
+        self.stdout.write(line.format(*header))
+        self.stdout.write(line.format(*("-" * w for w in widths)))
+        for row in rows:
+            self.stdout.write(line.format(*row))
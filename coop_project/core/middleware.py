@@ -1,7 +1,7 @@
 from django.shortcuts import redirect
-from django.urls import resolve
 from django.http import HttpResponseForbidden
-from .models import Division
+from .permissions import is_admin, is_coordinator, is_leadership
+from .request_division import get_request_division
 
 
 class COOPPermissionMiddleware:
@@ -28,11 +28,11 @@ class COOPPermissionMiddleware:
             return None
 
         # Admins always allowed
-        if user.is_superuser or user.groups.filter(name="COOP Admins").exists():
+        if is_admin(user):
             return None
 
         # Determine if this is an edit operation
-        path_name = resolve(request.path_info).url_name or ""
+        path_name = request.resolver_match.url_name or ""
         is_edit_operation = any(key in path_name for key in self.EDIT_KEYWORDS)
 
         # If not an edit operation, allow
@@ -40,28 +40,15 @@ class COOPPermissionMiddleware:
             return None
 
         # Leadership is read-only
-        if user.groups.filter(name="Leadership").exists():
+        if is_leadership(user):
             return HttpResponseForbidden("Leadership users cannot modify COOP data.")
 
         # Coordinators: must match division
-        if user.groups.filter(name="Coordinators").exists():
-            division = self._get_division_from_kwargs(view_kwargs)
-            if division and division.coordinator == user:
+        if is_coordinator(user):
+            division = get_request_division(request)
+            if division and division.coordinator_id == user.pk:
                 return None
             return HttpResponseForbidden("You are not allowed to edit this division.")
 
         # Default: deny
         return HttpResponseForbidden("You do not have permission to perform this action.")
-
-    def _get_division_from_kwargs(self, kwargs):
-        """
-        Extracts a Division instance from URL kwargs.
-        Supports both division_id and pk patterns.
-        """
-        division_id = kwargs.get("division_id") or kwargs.get("pk")
-        if division_id:
-            try:
-                return Division.objects.get(pk=division_id)
-            except Division.DoesNotExist:
-                return None
-        return None
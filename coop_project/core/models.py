@@ -26,6 +26,13 @@ class EssentialFunction(models.Model):
     alternate_procedures = models.TextField(blank=True)
     priority = models.CharField(max_length=50)
 
+    class Meta:
+        # Keyset-paginated list sorts; see listing.LIST_SPECS.
+        indexes = [
+            models.Index(fields=["division", "name", "id"], name="ef_div_name_idx"),
+            models.Index(fields=["division", "priority", "id"], name="ef_div_prio_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -40,6 +47,19 @@ class CriticalApplication(models.Model):
     vendor_contact = models.CharField(max_length=255, blank=True)
     dependencies = models.TextField(blank=True)
     workarounds = models.TextField(blank=True)
+    snow_sys_id = models.CharField(
+        max_length=32,
+        blank=True,
+        db_index=True,
+        help_text="ServiceNow sys_id for applications synced from the CMDB"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["division", "name", "id"], name="ca_div_name_idx"),
+            models.Index(fields=["division", "recovery_tier", "id"], name="ca_div_tier_idx"),
+            models.Index(fields=["division", "hosting_environment", "id"], name="ca_div_host_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -54,6 +74,13 @@ class KeyPersonnel(models.Model):
     mobile_phone = models.CharField(max_length=50, blank=True)
     email = models.CharField(max_length=255, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["division", "name", "id"], name="kp_div_name_idx"),
+            models.Index(fields=["division", "role", "id"], name="kp_div_role_idx"),
+            models.Index(fields=["division", "primary_or_alternate", "id"], name="kp_div_pri_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -69,6 +96,13 @@ class VitalRecord(models.Model):
     owner = models.CharField(max_length=255, blank=True)
     priority = models.CharField(max_length=50)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["division", "name", "id"], name="vr_div_name_idx"),
+            models.Index(fields=["division", "priority", "id"], name="vr_div_prio_idx"),
+            models.Index(fields=["division", "record_type", "id"], name="vr_div_type_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -82,6 +116,13 @@ class Dependency(models.Model):
     vendor_contact = models.CharField(max_length=255, blank=True)
     recovery_notes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["division", "name", "id"], name="dep_div_name_idx"),
+            models.Index(fields=["division", "criticality", "id"], name="dep_div_crit_idx"),
+            models.Index(fields=["division", "dependency_type", "id"], name="dep_div_type_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -96,6 +137,13 @@ class AlternateFacility(models.Model):
     contact = models.CharField(max_length=255, blank=True)
     notes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["division", "name", "id"], name="af_div_name_idx"),
+            models.Index(fields=["division", "facility_type", "id"], name="af_div_type_idx"),
+            models.Index(fields=["division", "it_availability", "id"], name="af_div_it_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -110,6 +158,12 @@ class Communication(models.Model):
     method = models.CharField(max_length=50)
     notes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["division", "communication_type", "id"], name="comm_div_type_idx"),
+            models.Index(fields=["division", "method", "id"], name="comm_div_method_idx"),
+        ]
+
     def __str__(self):
         return f"{self.communication_type} - {self.division.name}"
 
@@ -121,6 +175,13 @@ class RecoveryPriority(models.Model):
     priority_level = models.IntegerField()
     rationale = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["division", "priority_level", "id"], name="rp_div_level_idx"),
+            models.Index(fields=["division", "item_name", "id"], name="rp_div_name_idx"),
+            models.Index(fields=["division", "item_type", "id"], name="rp_div_type_idx"),
+        ]
+
     def __str__(self):
         return f"{self.item_name} (P{self.priority_level})"
 
@@ -167,13 +228,43 @@ class ServiceNowIntegrationConfig(models.Model):
     """Per-division ServiceNow sync configuration."""
     division = models.OneToOneField(Division, on_delete=models.CASCADE, related_name="snow_config")
     enabled = models.BooleanField(default=False)
+    # Connection details; blank fields fall back to the global SNOW_* settings.
+    instance_url = models.URLField(blank=True)
+    username = models.CharField(max_length=255, blank=True)
+    password = models.CharField(max_length=255, blank=True)
+    app_table = models.CharField(max_length=255, blank=True, help_text="Defaults to SNOW_APP_TABLE")
     query = models.CharField(
         max_length=500,
         blank=True,
         help_text="Optional ServiceNow sysparm_query filter string",
     )
     last_synced = models.DateTimeField(null=True, blank=True)
+    sync_frequency_hours = models.IntegerField(default=24)
+    watermark_updated_on = models.CharField(
+        max_length=32,
+        blank=True,
+        help_text="Raw (UTC) sys_updated_on of the newest record seen"
+    )
+    watermark_sys_id = models.CharField(max_length=32, blank=True)
+    last_full_sync = models.DateTimeField(null=True, blank=True)
     sync_notes = models.TextField(blank=True)
 
     def __str__(self):
         return f"ServiceNow config for {self.division.name} ({'enabled' if self.enabled else 'disabled'})"
+
+
+class ServiceNowSyncRecord(models.Model):
+    """
+    A ServiceNow record one paged sync run has seen, so the run can tell
+    whether it read every record before deleting the ones it didn't see.
+    Rows are removed when the run finishes.
+    """
+    run_id = models.CharField(max_length=100)
+    sys_id = models.CharField(max_length=32)
+    name = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        unique_together = ['run_id', 'sys_id']
+
+    def __str__(self):
+        return f"{self.run_id}: {self.sys_id}"
@@ -1,8 +1,71 @@
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+ADMIN_GROUP = "COOP Admins"
+LEADERSHIP_GROUP = "Leadership"
+COORDINATOR_GROUP = "Coordinators"
+
+_ROLE_CACHE_KEY = "coop:user-groups:{}"
+
+
+def get_group_names(user):
+    """
+    The user's group names, loaded with one query and remembered on the user
+    object, which Django builds afresh for each request. With
+    COOP_ROLE_CACHE_TTL set they are also cached across requests for that
+    many seconds; membership changes invalidate the entry (see
+    invalidate_user_roles).
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    names = getattr(user, "_coop_group_names", None)
+    if names is not None:
+        return names
+
+    ttl = getattr(settings, "COOP_ROLE_CACHE_TTL", 0)
+    key = _ROLE_CACHE_KEY.format(user.pk)
+    names = cache.get(key) if ttl else None
+    if names is None:
+        names = frozenset(user.groups.values_list("name", flat=True))
+        if ttl:
+            cache.set(key, names, ttl)
+    user._coop_group_names = names
+    return names
+
+
+def invalidate_user_roles(*user_ids):
+    cache.delete_many([_ROLE_CACHE_KEY.format(pk) for pk in user_ids])
+
+
 def is_admin(user):
-    return user.is_authenticated and (user.is_superuser or user.groups.filter(name="COOP Admins").exists())
+    return user.is_authenticated and (user.is_superuser or ADMIN_GROUP in get_group_names(user))
 
 def is_leadership(user):
-    return user.is_authenticated and (user.is_superuser or user.groups.filter(name="Leadership").exists())
+    return user.is_authenticated and (user.is_superuser or LEADERSHIP_GROUP in get_group_names(user))
 
 def is_coordinator(user):
-    return user.is_authenticated and user.groups.filter(name="Coordinators").exists()
+    return user.is_authenticated and COORDINATOR_GROUP in get_group_names(user)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_roles_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop cached group names when a user joins or leaves a group."""
+    if action not in ("post_add", "post_remove", "post_clear", "pre_clear"):
+        return
+    if not reverse:
+        invalidate_user_roles(instance.pk)
+    elif pk_set:
+        invalidate_user_roles(*pk_set)
+    else:
+        # group.user_set.clear(): the members are only known before the clear.
+        invalidate_user_roles(*instance.user_set.values_list("pk", flat=True))
+
+
+@receiver([post_save, pre_delete], sender=Group)
+def invalidate_roles_on_group_change(sender, instance, **kwargs):
+    """A renamed or deleted group changes its members' roles."""
+    if instance.pk:
+        invalidate_user_roles(*instance.user_set.values_list("pk", flat=True))
@@ -0,0 +1,109 @@
+"""
+Durable COOP plan generation jobs.
+
+Plan generation (python-docx build + PDF conversion) runs on a DBOS queue
+instead of inside the request, so the view only enqueues and returns a job id.
+Progress is published as a DBOS event that the status page polls.
+"""
+import threading
+import uuid
+
+from dbos import DBOS, DBOSConfig, Queue, SetWorkflowID
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections
+
+PLAN_JOB_PREFIX = "coop-plan"
+PLAN_PROGRESS_EVENT = "plan_progress"
+
+plan_generation_queue = Queue(
+    "coop_plan_generation",
+    worker_concurrency=getattr(settings, "COOP_PLAN_WORKER_CONCURRENCY", 2),
+)
+
+_dbos_launched = False
+_dbos_lock = threading.Lock()
+
+
+def launch_dbos(worker: bool | None = None):
+    """
+    Start the DBOS runtime in this process, once. Only a worker dequeues and
+    runs jobs: the run_plan_worker command, or the web process when
+    COOP_PLAN_WORKER_ENABLED is set. Everywhere else DBOS only enqueues and
+    reports job status, and is started lazily on first use.
+    """
+    global _dbos_launched
+    if worker is None:
+        worker = getattr(settings, "COOP_PLAN_WORKER_ENABLED", False)
+    with _dbos_lock:
+        if _dbos_launched:
+            return
+        url = getattr(settings, "DBOS_SYSTEM_DATABASE_URL", "")
+        if not url:
+            raise ImproperlyConfigured(
+                "DBOS_SYSTEM_DATABASE_URL must be set: plan generation jobs "
+                "are queued in the DBOS system database."
+            )
+        config: DBOSConfig = {"name": "coop-project", "system_database_url": url}
+        DBOS(config=config)
+        if not worker:
+            DBOS.listen_queues([])
+        DBOS.launch()
+        _dbos_launched = True
+
+
+def enqueue_coop_plan_generation(division_id: int, user_id: int | None = None) -> str:
+    """
+    Queue plan generation for a division and return the job id immediately.
+    The job id embeds the division so status lookups can be scoped to it.
+    """
+    launch_dbos()
+    job_id = f"{PLAN_JOB_PREFIX}-{division_id}-{uuid.uuid4().hex}"
+    with SetWorkflowID(job_id):
+        plan_generation_queue.enqueue(generate_coop_plan_workflow, division_id, user_id)
+    return job_id
+
+
+def job_belongs_to_division(job_id: str, division_id: int) -> bool:
+    return job_id.startswith(f"{PLAN_JOB_PREFIX}-{division_id}-")
+
+
+def get_coop_plan_job(job_id: str) -> dict | None:
+    """
+    Returns {job_id, status, progress, result} for a queued plan generation,
+    or None if no such job exists.
+    """
+    launch_dbos()
+    status = DBOS.get_workflow_status(job_id)
+    if status is None:
+        return None
+    progress = DBOS.get_event(job_id, PLAN_PROGRESS_EVENT, timeout_seconds=0)
+    return {
+        "job_id": job_id,
+        "status": status.status,
+        "progress": progress or "queued",
+        "result": status.output if status.status == "SUCCESS" else None,
+    }
+
+
+@DBOS.workflow()
+def generate_coop_plan_workflow(division_id: int, user_id: int | None = None) -> dict:
+    DBOS.set_event(PLAN_PROGRESS_EVENT, "rendering")
+    result = generate_coop_plan_step(division_id, user_id)
+    DBOS.set_event(PLAN_PROGRESS_EVENT, "complete" if result["success"] else "failed")
+    return result
+
+
+@DBOS.step()
+def generate_coop_plan_step(division_id: int, user_id: int | None) -> dict:
+    from django.contrib.auth.models import User
+    from core.services.coop_plan import generate_coop_plan_for_division
+
+    try:
+        generated_by = User.objects.filter(pk=user_id).first() if user_id else None
+        # Already plain values (paths, version, error), so it can be persisted.
+        return generate_coop_plan_for_division(division_id, generated_by=generated_by)
+    except Exception as exc:
+        return {"success": False, "error": str(exc)}
+    finally:
+        close_old_connections()
@@ -0,0 +1,124 @@
+"""
+Per-request SQL query accounting for development and CI.
+
+QueryBudgetMiddleware records every query a request issues (through
+connection.execute_wrapper, so DEBUG is not required), groups them by SQL
+shape, and flags shapes repeated COOP_QUERY_NPLUSONE_THRESHOLD or more times
+as N+1 candidates. A view may declare a budget with @query_budget(n), or via
+COOP_QUERY_BUDGETS = {"url_name": n}; COOP_QUERY_BUDGET_DEFAULT applies to
+everything else. Over-budget requests are logged, or raise QueryBudgetExceeded
+when COOP_QUERY_BUDGET_STRICT is on, which fails any test that hits them.
+
+The query_budget_report management command uses QueryRecorder directly to
+rank every route by query count.
+"""
+import logging
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view issued more queries than its declared budget."""
+
+
+def query_budget(max_queries):
+    """Declare the most queries a view may issue per request."""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+def sql_shape(sql):
+    """SQL with parameter lists collapsed, so per-row lookups group together."""
+    return _WHITESPACE.sub(" ", _IN_LIST.sub("IN (...)", sql)).strip()
+
+
+class QueryRecorder:
+    """
+    Context manager recording the queries run on the default connection.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def seconds(self):
+        return sum(duration for _sql, duration in self.queries)
+
+    def repeated_shapes(self, threshold=None):
+        """[(shape, count)] for shapes run at least `threshold` times, most frequent first."""
+        if threshold is None:
+            threshold = getattr(settings, "COOP_QUERY_NPLUSONE_THRESHOLD", 3)
+        shapes = Counter(sql_shape(sql) for sql, _duration in self.queries)
+        return [(shape, n) for shape, n in shapes.most_common() if n >= threshold]
+
+
+def budget_for(view_func, url_name):
+    budget = getattr(view_func, "query_budget", None)
+    if budget is None:
+        budget = getattr(settings, "COOP_QUERY_BUDGETS", {}).get(url_name)
+    if budget is None:
+        budget = getattr(settings, "COOP_QUERY_BUDGET_DEFAULT", None)
+    return budget
+
+
+class QueryBudgetMiddleware:
+    """
+    Development/CI only: counts queries per request, reports N+1 candidates
+    and enforces per-view budgets. Adds X-Query-Count to responses.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        match = getattr(request, "resolver_match", None)
+        url_name = (match.url_name if match else None) or request.path_info
+        response["X-Query-Count"] = str(recorder.count)
+
+        for shape, n in recorder.repeated_shapes():
+            logger.warning("Possible N+1 on %s: %d x %s", url_name, n, shape)
+
+        budget = budget_for(getattr(request, "_query_budget_view", None), url_name)
+        if budget is not None and recorder.count > budget:
+            message = f"{url_name} issued {recorder.count} queries (budget {budget})"
+            if getattr(settings, "COOP_QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget_view = view_func
+        return None
@@ -20,6 +20,7 @@ from core.models import (
     VitalRecord, Dependency, AlternateFacility, Communication,
     RecoveryPriority, DivisionMetadata, GeneratedPlan
 )
+from core.services.pdf_converter import PdfConversionError, get_converter_pool
 
 logger = logging.getLogger(__name__)
 
@@ -243,9 +244,21 @@ def _table_two_col(doc, pairs):
 
 def _convert_to_pdf(docx_path: str, output_dir: str) -> str | None:
     """
-    Attempt PDF conversion via LibreOffice.
+    Attempt PDF conversion via the persistent converter pool, falling back
+    to a one-off LibreOffice process.
     Returns PDF path on success, None if LibreOffice is unavailable.
     """
+    pool = get_converter_pool()
+    if pool is not None:
+        pdf_name = os.path.splitext(os.path.basename(docx_path))[0] + ".pdf"
+        pdf_path = os.path.join(output_dir, pdf_name)
+        try:
+            pool.convert(docx_path, pdf_path)
+            logger.info("PDF created: %s", pdf_path)
+            return pdf_path
+        except PdfConversionError as exc:
+            logger.warning("PDF converter pool failed, spawning LibreOffice: %s", exc)
+
     try:
         result = subprocess.run(
             [
@@ -0,0 +1,244 @@
+"""
+Persistent PDF conversion pool.
+
+Keeps a small number of headless LibreOffice processes running behind
+unoserver (https://github.com/unoconv/unoserver) and hands each DOCX -> PDF
+conversion to an idle one over a local XML-RPC socket. Compared with spawning
+`libreoffice --headless --convert-to pdf` per plan, this avoids the multi-second
+office cold start and keeps RSS bounded to the pool size.
+
+Settings:
+    COOP_PDF_POOL_SIZE             number of converters (0 disables the pool)
+    COOP_PDF_POOL_BASE_PORT        first port; converter i uses base + 2*i (+1 for UNO)
+    COOP_PDF_CONVERSION_TIMEOUT    per-job timeout in seconds
+    COOP_PDF_CONVERTER_STARTUP_TIMEOUT  seconds to wait for a converter to come up
+    COOP_PDF_CONVERTER_COMMAND     executable used to start a converter
+"""
+import atexit
+import http.client
+import logging
+import queue
+import socket
+import subprocess
+import threading
+import time
+import xmlrpc.client
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_HOST = "127.0.0.1"
+
+
+class PdfConversionError(Exception):
+    """Raised when the pool cannot convert a document."""
+
+
+class _TimeoutTransport(xmlrpc.client.Transport):
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def make_connection(self, host):
+        conn = super().make_connection(host)
+        conn.timeout = self.timeout
+        return conn
+
+
+class Converter:
+    """One long-lived unoserver process listening on a local port."""
+
+    def __init__(self, port: int, uno_port: int, command: str, startup_timeout: float):
+        self.port = port
+        self.uno_port = uno_port
+        self.command = command
+        self.startup_timeout = startup_timeout
+        self.process = None
+
+    def __repr__(self):
+        return f"<Converter port={self.port} pid={self.process.pid if self.process else None}>"
+
+    def _port_open(self) -> bool:
+        try:
+            with socket.create_connection((_HOST, self.port), timeout=1):
+                return True
+        except OSError:
+            return False
+
+    def is_healthy(self) -> bool:
+        if self.process is not None and self.process.poll() is not None:
+            return False
+        return self._port_open()
+
+    def start(self):
+        # Another worker process on this host may already run a converter on
+        # this port; share it rather than fighting over the socket.
+        if self._port_open():
+            logger.info("Attaching to existing PDF converter on port %s", self.port)
+            return
+        self.process = subprocess.Popen(
+            [
+                self.command,
+                "--interface", _HOST,
+                "--port", str(self.port),
+                "--uno-port", str(self.uno_port),
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise PdfConversionError(
+                    f"PDF converter on port {self.port} exited with code {self.process.returncode}"
+                )
+            if self._port_open():
+                logger.info("Started PDF converter %r", self)
+                return
+            time.sleep(0.25)
+        self.stop()
+        raise PdfConversionError(f"PDF converter on port {self.port} did not start in time")
+
+    def stop(self):
+        if self.process is None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+
+    @property
+    def owned(self) -> bool:
+        """False when attached to a converter another process started."""
+        return self.process is not None
+
+    def restart(self):
+        if not self.owned:
+            # Not ours to kill; the pool fails over to another port instead.
+            logger.warning("Not restarting PDF converter %r owned by another process", self)
+            return
+        logger.warning("Restarting PDF converter %r", self)
+        self.stop()
+        self.start()
+
+    def convert(self, docx_path: str, pdf_path: str, timeout: float):
+        proxy = xmlrpc.client.ServerProxy(
+            f"http://{_HOST}:{self.port}",
+            transport=_TimeoutTransport(timeout),
+            allow_none=True,
+        )
+        # unoserver signature: convert(inpath, indata, outpath, convert_to, ...)
+        proxy.convert(docx_path, None, pdf_path, "pdf")
+
+
+class PdfConverterPool:
+    """Fixed-size pool of converters; callers block until one is idle."""
+
+    def __init__(self, size: int, base_port: int, timeout: float,
+                 command: str = "unoserver", startup_timeout: float = 30):
+        self.timeout = timeout
+        self._idle = queue.Queue()
+        self._converters = [
+            Converter(base_port + 2 * i, base_port + 2 * i + 1, command, startup_timeout)
+            for i in range(size)
+        ]
+        for converter in self._converters:
+            self._idle.put(converter)
+
+    def _checkout(self, exclude=()) -> Converter:
+        """An idle converter not in `exclude`, started or restarted if it is down."""
+        deadline = time.monotonic() + self.timeout
+        skipped = []
+        try:
+            while True:
+                try:
+                    converter = self._idle.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    raise PdfConversionError("Timed out waiting for an idle PDF converter")
+                if converter not in exclude:
+                    break
+                skipped.append(converter)
+        finally:
+            for other in skipped:
+                self._idle.put(other)
+        try:
+            if not converter.is_healthy():
+                if converter.owned:
+                    converter.restart()
+                else:
+                    converter.start()
+        except Exception:
+            self._idle.put(converter)
+            raise
+        return converter
+
+    def convert(self, docx_path: str, pdf_path: str) -> str:
+        """
+        Convert on an idle converter. If it times out or drops the
+        connection, the next one is tried (after restarting the failed one,
+        if this process spawned it), up to once per converter.
+        """
+        tried = []
+        error = None
+        for _attempt in range(len(self._converters)):
+            converter = self._checkout(exclude=tried)
+            tried.append(converter)
+            try:
+                converter.convert(docx_path, pdf_path, self.timeout)
+                return pdf_path
+            except xmlrpc.client.Fault as exc:
+                # The converter answered: the document itself failed.
+                raise PdfConversionError(f"PDF conversion failed: {exc.faultString}") from exc
+            except (socket.timeout, TimeoutError) as exc:
+                # A converter that misses its deadline is assumed wedged.
+                self._recover(converter)
+                error = PdfConversionError(f"PDF conversion timed out after {self.timeout}s on {converter!r}")
+                error.__cause__ = exc
+            except (OSError, http.client.HTTPException, xmlrpc.client.Error) as exc:
+                if not converter.is_healthy():
+                    self._recover(converter)
+                error = PdfConversionError(f"PDF conversion failed on {converter!r}: {exc}")
+                error.__cause__ = exc
+            finally:
+                self._idle.put(converter)
+            if len(tried) < len(self._converters):
+                logger.warning("%s; trying the next converter", error)
+        raise error
+
+    def _recover(self, converter: Converter):
+        try:
+            converter.restart()
+        except PdfConversionError as exc:
+            # _checkout retries the start next time the converter is picked.
+            logger.warning("%s", exc)
+
+    def shutdown(self):
+        for converter in self._converters:
+            converter.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_converter_pool() -> PdfConverterPool | None:
+    """Returns the process-wide pool, or None when it is disabled."""
+    global _pool
+    size = getattr(settings, "COOP_PDF_POOL_SIZE", 0)
+    if size <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = PdfConverterPool(
+                size=size,
+                base_port=getattr(settings, "COOP_PDF_POOL_BASE_PORT", 2003),
+                timeout=getattr(settings, "COOP_PDF_CONVERSION_TIMEOUT", 60),
+                command=getattr(settings, "COOP_PDF_CONVERTER_COMMAND", "unoserver"),
+                startup_timeout=getattr(settings, "COOP_PDF_CONVERTER_STARTUP_TIMEOUT", 30),
+            )
+            atexit.register(_pool.shutdown)
+    return _pool
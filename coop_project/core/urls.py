@@ -183,6 +183,16 @@ urlpatterns = [
         views.generate_coop_plan_view,
         name="generate_coop_plan"
     ),
+    path(
+        "divisions/<int:division_id>/plan/jobs/<str:job_id>/",
+        views.coop_plan_job_status,
+        name="coop_plan_job_status"
+    ),
+    path(
+        "divisions/<int:division_id>/plan/jobs/<str:job_id>/status/",
+        views.coop_plan_job_status_api,
+        name="coop_plan_job_status_api"
+    ),
     path(
         "divisions/<int:division_id>/plan/history/",
         views.coop_plan_history,
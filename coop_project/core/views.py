@@ -1,6 +1,6 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count
+from django.http import Http404, JsonResponse
 from .models import (
     Division, EssentialFunction, CriticalApplication, KeyPersonnel,
     VitalRecord, Dependency, AlternateFacility, Communication,
@@ -11,8 +11,14 @@ from .forms import (
     VitalRecordForm, DependencyForm, AlternateFacilityForm,
     CommunicationForm, RecoveryPriorityForm, DivisionMetadataForm
 )
-from .services.coop_plan import generate_coop_plan_for_division
-from .permissions import is_leadership, is_admin
+from .dashboard import get_leadership_dashboard
+from .listing import keyset_paginate
+from .query_budget import query_budget
+from .request_division import get_division_or_404, get_item_division
+from .permissions import is_leadership, is_admin, is_coordinator
+from .plan_workflows import (
+    enqueue_coop_plan_generation, get_coop_plan_job, job_belongs_to_division
+)
 
 
 # ---------------------------------------------------------
@@ -21,15 +27,9 @@ from .permissions import is_leadership, is_admin
 
 def can_edit_division(user, division):
     """Admins can edit everything. Coordinators can edit their division only."""
-    if not user.is_authenticated:
-        return False
-    if user.is_superuser:
-        return True
-    if user.groups.filter(name="COOP Admins").exists():
+    if is_admin(user):
         return True
-    if user.groups.filter(name="Coordinators").exists() and division.coordinator == user:
-        return True
-    return False
+    return is_coordinator(user) and division.coordinator_id == user.pk
 
 
 # ---------------------------------------------------------
@@ -37,14 +37,16 @@ def can_edit_division(user, division):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(5)
 def division_list(request):
     divisions = Division.objects.all()
     return render(request, "divisions/list.html", {"divisions": divisions})
 
 
 @login_required
+@query_budget(5)
 def division_detail(request, pk):
-    division = get_object_or_404(Division, pk=pk)
+    division = get_division_or_404(request, pk)
     return render(request, "divisions/detail.html", {"division": division})
 
 
@@ -53,15 +55,17 @@ def division_detail(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(8)
 def essential_function_list(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     items = EssentialFunction.objects.filter(division=division)
-    return render(request, "essential_functions/list.html", {"division": division, "items": items})
+    page = keyset_paginate(request, items, division)
+    return render(request, "essential_functions/list.html", {"division": division, "items": page.items, "page": page})
 
 
 @login_required
 def essential_function_create(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     if not can_edit_division(request.user, division):
         return redirect("essential_function_list", division_id=division.id)
     if request.method == "POST":
@@ -79,7 +83,7 @@ def essential_function_create(request, division_id):
 @login_required
 def essential_function_edit(request, pk):
     item = get_object_or_404(EssentialFunction, pk=pk)
-    division = item.division
+    division = get_item_division(request, item)
     if not can_edit_division(request.user, division):
         return redirect("essential_function_list", division_id=division.id)
     if request.method == "POST":
@@ -97,15 +101,17 @@ def essential_function_edit(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(8)
 def critical_application_list(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     items = CriticalApplication.objects.filter(division=division)
-    return render(request, "critical_applications/list.html", {"division": division, "items": items})
+    page = keyset_paginate(request, items, division)
+    return render(request, "critical_applications/list.html", {"division": division, "items": page.items, "page": page})
 
 
 @login_required
 def critical_application_create(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     if not can_edit_division(request.user, division):
         return redirect("critical_application_list", division_id=division.id)
     if request.method == "POST":
@@ -123,7 +129,7 @@ def critical_application_create(request, division_id):
 @login_required
 def critical_application_edit(request, pk):
     item = get_object_or_404(CriticalApplication, pk=pk)
-    division = item.division
+    division = get_item_division(request, item)
     if not can_edit_division(request.user, division):
         return redirect("critical_application_list", division_id=division.id)
     if request.method == "POST":
@@ -141,15 +147,17 @@ def critical_application_edit(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(8)
 def key_personnel_list(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     items = KeyPersonnel.objects.filter(division=division)
-    return render(request, "key_personnel/list.html", {"division": division, "items": items})
+    page = keyset_paginate(request, items, division)
+    return render(request, "key_personnel/list.html", {"division": division, "items": page.items, "page": page})
 
 
 @login_required
 def key_personnel_create(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     if not can_edit_division(request.user, division):
         return redirect("key_personnel_list", division_id=division.id)
     if request.method == "POST":
@@ -167,7 +175,7 @@ def key_personnel_create(request, division_id):
 @login_required
 def key_personnel_edit(request, pk):
     item = get_object_or_404(KeyPersonnel, pk=pk)
-    division = item.division
+    division = get_item_division(request, item)
     if not can_edit_division(request.user, division):
         return redirect("key_personnel_list", division_id=division.id)
     if request.method == "POST":
@@ -185,15 +193,17 @@ def key_personnel_edit(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(8)
 def vital_record_list(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     items = VitalRecord.objects.filter(division=division)
-    return render(request, "vital_records/list.html", {"division": division, "items": items})
+    page = keyset_paginate(request, items, division)
+    return render(request, "vital_records/list.html", {"division": division, "items": page.items, "page": page})
 
 
 @login_required
 def vital_record_create(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     if not can_edit_division(request.user, division):
         return redirect("vital_record_list", division_id=division.id)
     if request.method == "POST":
@@ -211,7 +221,7 @@ def vital_record_create(request, division_id):
 @login_required
 def vital_record_edit(request, pk):
     item = get_object_or_404(VitalRecord, pk=pk)
-    division = item.division
+    division = get_item_division(request, item)
     if not can_edit_division(request.user, division):
         return redirect("vital_record_list", division_id=division.id)
     if request.method == "POST":
@@ -229,15 +239,17 @@ def vital_record_edit(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(8)
 def dependency_list(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     items = Dependency.objects.filter(division=division)
-    return render(request, "dependencies/list.html", {"division": division, "items": items})
+    page = keyset_paginate(request, items, division)
+    return render(request, "dependencies/list.html", {"division": division, "items": page.items, "page": page})
 
 
 @login_required
 def dependency_create(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     if not can_edit_division(request.user, division):
         return redirect("dependency_list", division_id=division.id)
     if request.method == "POST":
@@ -255,7 +267,7 @@ def dependency_create(request, division_id):
 @login_required
 def dependency_edit(request, pk):
     item = get_object_or_404(Dependency, pk=pk)
-    division = item.division
+    division = get_item_division(request, item)
     if not can_edit_division(request.user, division):
         return redirect("dependency_list", division_id=division.id)
     if request.method == "POST":
@@ -273,15 +285,17 @@ def dependency_edit(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(8)
 def alternate_facility_list(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     items = AlternateFacility.objects.filter(division=division)
-    return render(request, "alternate_facilities/list.html", {"division": division, "items": items})
+    page = keyset_paginate(request, items, division)
+    return render(request, "alternate_facilities/list.html", {"division": division, "items": page.items, "page": page})
 
 
 @login_required
 def alternate_facility_create(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     if not can_edit_division(request.user, division):
         return redirect("alternate_facility_list", division_id=division.id)
     if request.method == "POST":
@@ -299,7 +313,7 @@ def alternate_facility_create(request, division_id):
 @login_required
 def alternate_facility_edit(request, pk):
     item = get_object_or_404(AlternateFacility, pk=pk)
-    division = item.division
+    division = get_item_division(request, item)
     if not can_edit_division(request.user, division):
         return redirect("alternate_facility_list", division_id=division.id)
     if request.method == "POST":
@@ -317,15 +331,17 @@ def alternate_facility_edit(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(8)
 def communication_list(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     items = Communication.objects.filter(division=division)
-    return render(request, "communications/list.html", {"division": division, "items": items})
+    page = keyset_paginate(request, items, division)
+    return render(request, "communications/list.html", {"division": division, "items": page.items, "page": page})
 
 
 @login_required
 def communication_create(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     if not can_edit_division(request.user, division):
         return redirect("communication_list", division_id=division.id)
     if request.method == "POST":
@@ -343,7 +359,7 @@ def communication_create(request, division_id):
 @login_required
 def communication_edit(request, pk):
     item = get_object_or_404(Communication, pk=pk)
-    division = item.division
+    division = get_item_division(request, item)
     if not can_edit_division(request.user, division):
         return redirect("communication_list", division_id=division.id)
     if request.method == "POST":
@@ -361,15 +377,17 @@ def communication_edit(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(8)
 def recovery_priority_list(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     items = RecoveryPriority.objects.filter(division=division)
-    return render(request, "recovery_priorities/list.html", {"division": division, "items": items})
+    page = keyset_paginate(request, items, division)
+    return render(request, "recovery_priorities/list.html", {"division": division, "items": page.items, "page": page})
 
 
 @login_required
 def recovery_priority_create(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     if not can_edit_division(request.user, division):
         return redirect("recovery_priority_list", division_id=division.id)
     if request.method == "POST":
@@ -387,7 +405,7 @@ def recovery_priority_create(request, division_id):
 @login_required
 def recovery_priority_edit(request, pk):
     item = get_object_or_404(RecoveryPriority, pk=pk)
-    division = item.division
+    division = get_item_division(request, item)
     if not can_edit_division(request.user, division):
         return redirect("recovery_priority_list", division_id=division.id)
     if request.method == "POST":
@@ -405,15 +423,16 @@ def recovery_priority_edit(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(6)
 def division_metadata_detail(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     metadata = get_object_or_404(DivisionMetadata, division=division)
     return render(request, "division_metadata/detail.html", {"division": division, "metadata": metadata})
 
 
 @login_required
 def division_metadata_edit(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     metadata = get_object_or_404(DivisionMetadata, division=division)
     if not can_edit_division(request.user, division):
         return redirect("division_metadata_detail", division_id=division.id)
@@ -433,22 +452,51 @@ def division_metadata_edit(request, division_id):
 
 @login_required
 def generate_coop_plan_view(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     if not can_edit_division(request.user, division):
         return redirect("division_detail", pk=division.id)
     if request.method == "POST":
-        result = generate_coop_plan_for_division(division.id, generated_by=request.user)
-        return render(request, "coop_plan/generate_result.html", {"division": division, "result": result})
+        job_id = enqueue_coop_plan_generation(division.id, user_id=request.user.id)
+        return redirect("coop_plan_job_status", division_id=division.id, job_id=job_id)
     return redirect("division_detail", pk=division.id)
 
 
+def _get_division_plan_job(division, job_id):
+    if not job_belongs_to_division(job_id, division.id):
+        raise Http404("Unknown plan generation job.")
+    job = get_coop_plan_job(job_id)
+    if job is None:
+        raise Http404("Unknown plan generation job.")
+    return job
+
+
+@login_required
+def coop_plan_job_status(request, division_id, job_id):
+    """
+    Status page for a queued plan generation. Refreshes itself until the job
+    finishes, then shows the same result page the synchronous flow used to.
+    """
+    division = get_division_or_404(request, division_id)
+    job = _get_division_plan_job(division, job_id)
+    if job["result"] is not None:
+        return render(request, "coop_plan/generate_result.html", {"division": division, "result": job["result"]})
+    return render(request, "coop_plan/job_status.html", {"division": division, "job": job})
+
+
+@login_required
+def coop_plan_job_status_api(request, division_id, job_id):
+    division = get_division_or_404(request, division_id)
+    return JsonResponse(_get_division_plan_job(division, job_id))
+
+
 # ---------------------------------------------------------
 # PLAN HISTORY
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(5)
 def coop_plan_history(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     plans = GeneratedPlan.objects.filter(division=division).order_by("-created_at")
     return render(request, "coop_plan/history.html", {"division": division, "plans": plans})
 
@@ -458,6 +506,7 @@ def coop_plan_history(request, division_id):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(5)
 def leadership_dashboard(request):
     """
     Read-only overview of all divisions for Leadership and Admin users.
@@ -466,20 +515,8 @@ def leadership_dashboard(request):
     if not (is_leadership(request.user) or is_admin(request.user)):
         return redirect("division_list")
 
-    divisions = Division.objects.annotate(
-        ef_count=Count("essentialfunction", distinct=True),
-        app_count=Count("criticalapplication", distinct=True),
-        personnel_count=Count("keypersonnel", distinct=True),
-    ).order_by("name")
-
-    status_summary = {
-        "total": divisions.count(),
-        "approved": divisions.filter(plan_status="Approved").count(),
-        "draft": divisions.filter(plan_status="Draft").count(),
-        "under_review": divisions.filter(plan_status="Under Review").count(),
-    }
-
+    dashboard = get_leadership_dashboard()
     return render(request, "dashboard/leadership.html", {
-        "divisions": divisions,
-        "status_summary": status_summary,
+        "divisions": dashboard["divisions"],
+        "status_summary": dashboard["status_summary"],
     })
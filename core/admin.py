@@ -1,12 +1,36 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from .models import (
     Division, EssentialFunction, CriticalApplication, KeyPersonnel,
     VitalRecord, Dependency, AlternateFacility, Communication,
     RecoveryPriority, DivisionMetadata, GeneratedPlan,
     ServiceNowIntegrationConfig
 )
+from .plan_workflows import enqueue_coop_plan_generation
+from .sync_workflows import enqueue_servicenow_sync
+
+
+@admin.register(Division)
+class DivisionAdmin(admin.ModelAdmin):
+    list_display = ("name", "plan_status", "plan_version", "next_review_date")
+    list_filter = ("plan_status",)
+    search_fields = ("name",)
+    actions = ["generate_coop_plans"]
+
+    @admin.action(description="Generate COOP plans for selected divisions")
+    def generate_coop_plans(self, request, queryset):
+        # Queue one job per division so the admin request returns immediately;
+        # the plan generation queue bounds how many render at once.
+        division_ids = list(queryset.values_list("pk", flat=True))
+        for division_id in division_ids:
+            enqueue_coop_plan_generation(division_id, user_id=request.user.id)
+        self.message_user(
+            request,
+            f"Queued plan generation for {len(division_ids)} division(s). "
+            "Results will appear in each division's plan history.",
+            messages.SUCCESS,
+        )
+
 
-admin.site.register(Division)
 admin.site.register(EssentialFunction)
 admin.site.register(CriticalApplication)
 admin.site.register(KeyPersonnel)
@@ -17,4 +41,28 @@ admin.site.register(Communication)
 admin.site.register(RecoveryPriority)
 admin.site.register(DivisionMetadata)
 admin.site.register(GeneratedPlan)
-admin.site.register(ServiceNowIntegrationConfig)
+
+
+@admin.register(ServiceNowIntegrationConfig)
+class ServiceNowIntegrationConfigAdmin(admin.ModelAdmin):
+    list_display = ("division", "enabled", "instance_url", "last_sync", "last_full_sync")
+    list_filter = ("enabled",)
+    actions = ["queue_sync", "queue_full_sync"]
+
+    def _queue(self, request, queryset, full):
+        config_ids = list(queryset.values_list("pk", flat=True))
+        for config_id in config_ids:
+            enqueue_servicenow_sync(config_id, full=full)
+        self.message_user(
+            request,
+            f"Queued ServiceNow sync for {len(config_ids)} division(s).",
+            messages.SUCCESS,
+        )
+
+    @admin.action(description="Sync selected divisions from ServiceNow")
+    def queue_sync(self, request, queryset):
+        self._queue(request, queryset, full=False)
+
+    @admin.action(description="Full sync selected divisions from ServiceNow")
+    def queue_full_sync(self, request, queryset):
+        self._queue(request, queryset, full=True)
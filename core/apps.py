@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    name = "app"
+    default_auto_field = "django.db.models.BigAutoField"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # DBOS is not started here: ready() runs in every process (migrate,
+        # management commands, plan-rendering pool workers). The web process
+        # starts it on first use (plan_workflows.launch_dbos) and queue
+        # workers run under `manage.py run_plan_worker`.
@@ -0,0 +1,83 @@
+"""
+Leadership dashboard payload.
+
+Every executive loads the dashboard at once during an event, so the whole
+payload is built by one query and cached. Each division's child counts are
+correlated subqueries rather than joins: three LEFT JOINs multiply the rows
+per division before COUNT(DISTINCT ...) can collapse them. The status
+breakdown is tallied from the same rows.
+
+Any save or delete of a division or a counted child row drops the cache
+once its transaction commits (see signals.py). Writes that send no signals
+(QuerySet.update(), bulk_create) call invalidate_leadership_dashboard()
+themselves. COOP_DASHBOARD_CACHE_TTL bounds staleness in other processes
+when CACHES is not shared.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Division, EssentialFunction, CriticalApplication, KeyPersonnel, VitalRecord
+
+DASHBOARD_CACHE_KEY = "coop:leadership_dashboard"
+
+# Division row field -> child model it counts.
+COUNTED_MODELS = {
+    "ef_count": EssentialFunction,
+    "app_count": CriticalApplication,
+    "personnel_count": KeyPersonnel,
+    "vital_record_count": VitalRecord,
+}
+
+# status_summary key -> Division.plan_status value.
+PLAN_STATUSES = {
+    "approved": "Approved",
+    "under_review": "Under Review",
+    "draft": "Draft",
+}
+
+
+def _child_count(model):
+    counts = (
+        model.objects.filter(division=OuterRef("pk"))
+        .order_by()
+        .values("division")
+        .annotate(n=Count("pk"))
+        .values("n")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def build_leadership_dashboard():
+    """{"divisions": [row dicts], "status_summary": {...}}, straight from the database."""
+    divisions = list(
+        Division.objects
+        .annotate(**{name: _child_count(model) for name, model in COUNTED_MODELS.items()})
+        .order_by("name")
+        .values(
+            "id", "name", "plan_status", "plan_version", "last_updated",
+            "next_review_date", *COUNTED_MODELS,
+        )
+    )
+    statuses = Counter(div["plan_status"] for div in divisions)
+    status_summary = {"total": len(divisions)}
+    status_summary.update({key: statuses[status] for key, status in PLAN_STATUSES.items()})
+    return {"divisions": divisions, "status_summary": status_summary}
+
+
+def get_leadership_dashboard():
+    payload = cache.get(DASHBOARD_CACHE_KEY)
+    if payload is None:
+        payload = build_leadership_dashboard()
+        cache.set(DASHBOARD_CACHE_KEY, payload, getattr(settings, "COOP_DASHBOARD_CACHE_TTL", 300))
+    return payload
+
+
+def invalidate_leadership_dashboard():
+    """Drop the cached payload once the current transaction (if any) commits."""
+    transaction.on_commit(lambda: cache.delete(DASHBOARD_CACHE_KEY))
+
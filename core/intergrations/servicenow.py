@@ -1,19 +1,268 @@
+import codecs
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from email.utils import parsedate_to_datetime
+
 import requests
-from typing import List, Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Iterable, Iterator
 from django.conf import settings
-from app.models import Division, CriticalApplication
+from django.db import transaction
+from django.utils import timezone
+from app.dashboard import invalidate_leadership_dashboard
+from app.listing import invalidate_filter_options
+from app.models import (
+    Division, CriticalApplication, ServiceNowIntegrationConfig, ServiceNowSyncRecord
+)
+
+# CriticalApplication field -> ServiceNow columns to read it from, in order of
+# preference (the first non-empty value wins). Override with SNOW_FIELD_MAP.
+DEFAULT_FIELD_MAP: Dict[str, tuple] = {
+    "name": ("name", "u_application_name"),
+    "description": ("description",),
+    "hosting_environment": ("u_hosting_environment",),
+    "recovery_tier": ("u_recovery_tier",),
+    "rto": ("u_rto",),
+    "vendor_contact": ("u_vendor_contact",),
+    "dependencies": ("u_dependencies",),
+    "workarounds": ("u_workarounds",),
+    "snow_sys_id": ("sys_id",),
+}
+
+# Columns every sync reads so it can advance the incremental watermark.
+WATERMARK_COLUMNS = ("sys_updated_on", "sys_id")
+
+
+def get_field_map() -> Dict[str, tuple]:
+    field_map = getattr(settings, "SNOW_FIELD_MAP", None) or DEFAULT_FIELD_MAP
+    field_map = {field: tuple(columns) for field, columns in field_map.items()}
+    # Full syncs only delete applications they can tell came from ServiceNow.
+    field_map.setdefault("snow_sys_id", ("sys_id",))
+    return field_map
+
+
+def _raw(value: Any) -> str:
+    # Records are requested with sysparm_display_value=all, so each column is
+    # {display_value, value}.
+    if isinstance(value, dict):
+        return value.get("value") or ""
+    return value or ""
+
+
+def _display(value: Any) -> str:
+    if isinstance(value, dict):
+        return value.get("display_value") or ""
+    return value or ""
+
+
+def snow_columns(field_map: Dict[str, tuple]) -> List[str]:
+    """The ServiceNow columns a field map reads, for sysparm_fields."""
+    columns = []
+    for sources in field_map.values():
+        for column in sources:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def use_display_values() -> bool:
+    """Whether mapped fields take ServiceNow display values (SNOW_DISPLAY_VALUE)."""
+    return str(getattr(settings, "SNOW_DISPLAY_VALUE", "true")).lower() == "true"
+
+
+def map_record(rec: Dict[str, Any], field_map: Dict[str, tuple]) -> Dict[str, str]:
+    """Translate one ServiceNow record into CriticalApplication field values."""
+    display = _display if use_display_values() else _raw
+    mapped = {}
+    for field, sources in field_map.items():
+        # sys_id is an identifier, never a label.
+        pick = _raw if field == "snow_sys_id" else display
+        value = ""
+        for column in sources:
+            value = pick(rec.get(column))
+            if value:
+                break
+        mapped[field] = value
+    return mapped
+
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_RESULT_START = re.compile(r'\s*\{\s*"result"\s*:\s*\[')
+_SEPARATOR = re.compile(r"[\s,]*")
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def iter_result_records(response: requests.Response) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the records of a Table API {"result": [...]} response body as each
+    one is parsed, so a page never exists as one large string plus one large
+    list at the same time. The response should be requested with stream=True.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder(response.encoding or "utf-8")()
+    chunks = response.iter_content(chunk_size=_STREAM_CHUNK_SIZE)
+    buf = ""
+    pos = 0
+
+    def read_more() -> bool:
+        nonlocal buf, pos
+        for chunk in chunks:
+            decoded = text.decode(chunk)
+            if decoded:
+                buf = buf[pos:] + decoded
+                pos = 0
+                return True
+        return False
+
+    while True:
+        match = _RESULT_START.match(buf)
+        if match:
+            pos = match.end()
+            break
+        if len(buf) > 64 or not read_more():
+            # Not the usual shape (e.g. other keys first): parse it whole.
+            while read_more():
+                pass
+            yield from json.loads(buf or "{}").get("result", [])
+            return
+
+    while True:
+        pos = _SEPARATOR.match(buf, pos).end()
+        if pos >= len(buf):
+            if not read_more():
+                raise ValueError("ServiceNow response ended inside the result list")
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            record, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if not read_more():
+                raise
+            continue
+        yield record
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: at most `rate` requests per second with bursts
+    of up to `burst`. A 429 from the instance can pause() every caller
+    sharing the limiter, not just the thread that saw it.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0 and self.rate > 0:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                elif wait <= 0:
+                    return
+            time.sleep(wait)
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(instance_url: str) -> RateLimiter:
+    """One limiter per instance, shared by every client in the process."""
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(instance_url)
+        if limiter is None:
+            limiter = RateLimiter(
+                rate=getattr(settings, "SNOW_RATE_LIMIT", 0),
+                burst=getattr(settings, "SNOW_RATE_BURST", 5),
+            )
+            _rate_limiters[instance_url] = limiter
+        return limiter
+
+
+def _retry_after(response: requests.Response) -> float | None:
+    """Seconds requested by a Retry-After header (delta or HTTP date), if any."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
 
 
 class ServiceNowClient:
     """
     Simple ServiceNow CMDB client for pulling application data.
+
+    Large tables are read page by page with sysparm_offset. Once the first
+    page reports the table size in X-Total-Count, the remaining pages are
+    fetched concurrently (up to SNOW_MAX_CONCURRENCY at a time).
+
+    Requests go through one pooled requests.Session (keep-alive and TLS
+    session reuse), are paced by the instance's shared RateLimiter, and
+    429/5xx responses or connection errors are retried with exponential
+    backoff plus jitter, honouring Retry-After. Use get_client() to share one
+    client (and its pool) per instance and set of credentials.
     """
 
-    def __init__(self):
-        self.instance_url = settings.SNOW_INSTANCE_URL.rstrip("/")
-        self.username = settings.SNOW_USERNAME
-        self.password = settings.SNOW_PASSWORD
-        self.table = getattr(settings, "SNOW_APP_TABLE", "cmdb_ci_service")
+    def __init__(self, instance_url: str | None = None, username: str | None = None,
+                 password: str | None = None, table: str | None = None):
+        self.instance_url = (instance_url or settings.SNOW_INSTANCE_URL).rstrip("/")
+        self.username = username if username is not None else settings.SNOW_USERNAME
+        self.password = password if password is not None else settings.SNOW_PASSWORD
+        self.table = table or getattr(settings, "SNOW_APP_TABLE", "cmdb_ci_service")
+        self.page_size = getattr(settings, "SNOW_PAGE_SIZE", 1000)
+        self.max_concurrency = getattr(settings, "SNOW_MAX_CONCURRENCY", 4)
+        self.timeout = getattr(settings, "SNOW_TIMEOUT", 30)
+        self.max_retries = getattr(settings, "SNOW_MAX_RETRIES", 5)
+        self.backoff_base = getattr(settings, "SNOW_BACKOFF_BASE", 0.5)
+        self.backoff_max = getattr(settings, "SNOW_BACKOFF_MAX", 60)
+        self.rate_limiter = get_rate_limiter(self.instance_url)
+
+        pool_size = getattr(settings, "SNOW_POOL_SIZE", max(self.max_concurrency, 10))
+        self.session = requests.Session()
+        self.session.auth = (self.username, self.password)
+        self.session.headers.update(self._headers())
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def _headers(self) -> Dict[str, str]:
         return {
@@ -24,67 +273,543 @@ class ServiceNowClient:
     def _base_url(self) -> str:
         return f"{self.instance_url}/api/now/table/{self.table}"
 
-    def fetch_applications(self, query: str | None = None, limit: int = 200) -> List[Dict[str, Any]]:
-        """
-        Fetch application records from ServiceNow CMDB.
-        Optionally filter with a ServiceNow sysparm_query.
-        """
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": a random delay up to the exponential ceiling.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _get(self, url: str, params: Dict[str, str] | None = None,
+             stream: bool = False) -> requests.Response:
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                delay = _retry_after(response)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                else:
+                    delay = min(delay, self.backoff_max)
+                if response.status_code == 429:
+                    self.rate_limiter.pause(delay)
+                response.close()
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            response.raise_for_status()
+            return response
+
+    def _page_params(self, query: str | None, offset: int, limit: int,
+                     fields: Iterable[str] | None = None) -> Dict[str, str]:
+        # A stable sort keeps offsets consistent between concurrently fetched pages.
+        ordered = f"{query}^ORDERBYsys_id" if query else "ORDERBYsys_id"
         params = {
+            "sysparm_query": ordered,
             "sysparm_limit": str(limit),
+            "sysparm_offset": str(offset),
+            "sysparm_exclude_reference_link": "true",
+            # Both forms of every column: mapped fields take display values
+            # (see use_display_values), while watermarks and sys_ids need the
+            # raw, UTC values whatever the integration user's locale is.
+            "sysparm_display_value": "all",
         }
-        if query:
-            params["sysparm_query"] = query
-
-        response = requests.get(
-            self._base_url(),
-            headers=self._headers(),
-            auth=(self.username, self.password),
-            params=params,
-            timeout=30,
+        if fields:
+            params["sysparm_fields"] = ",".join(fields)
+        return params
+
+    def fetch_page(self, query: str | None, offset: int, limit: int,
+                   fields: Iterable[str] | None = None) -> List[Dict[str, Any]]:
+        """One page of records, starting at `offset` in sys_id order."""
+        return self.fetch_page_and_total(query, offset, limit, fields)[0]
+
+    def fetch_page_and_total(self, query: str | None, offset: int, limit: int,
+                             fields: Iterable[str] | None = None) -> tuple:
+        """(records, X-Total-Count or None) for the page at `offset`."""
+        response = self._get(
+            self._base_url(), self._page_params(query, offset, limit, fields), stream=True
         )
-        response.raise_for_status()
-        data = response.json()
-        return data.get("result", [])
+        total = response.headers.get("X-Total-Count")
+        with response:
+            return list(iter_result_records(response)), int(total) if total is not None else None
 
+    def iter_applications(self, query: str | None = None, limit: int | None = None,
+                          fields: Iterable[str] | None = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every matching application record (or at most `limit`).
+        Optionally filter with a ServiceNow sysparm_query, and restrict the
+        columns returned with `fields` (sysparm_fields).
 
-def sync_critical_applications_from_servicenow(division: Division, query: str | None = None) -> dict:
-    """
-    Pulls applications from ServiceNow and syncs them into CriticalApplication
-    for the given division.
+        Responses are parsed incrementally, and at most SNOW_MAX_CONCURRENCY
+        pages are held in memory at once, however large the table.
+
+        Page offsets always advance by the requested page size: a page can
+        come back short (ACL-filtered rows, an instance row cap) without being
+        the last one. A row that shifts across a page boundary while pages are
+        fetched comes back on both sides of it, so each page is de-duplicated
+        on sys_id against the one before. Only that page's sys_ids are kept,
+        so memory stays flat; anything further apart is absorbed by the
+        reconciler's upsert by name.
+        """
+        fields = list(fields) if fields else None
+        page_size = min(self.page_size, limit) if limit else self.page_size
+        previous = set()
+
+        def unseen(records):
+            nonlocal previous
+            current = set()
+            for rec in records:
+                sys_id = _raw(rec.get("sys_id"))
+                if sys_id:
+                    if sys_id in previous or sys_id in current:
+                        continue
+                    current.add(sys_id)
+                yield rec
+            previous = current
+
+        first = self._get(
+            self._base_url(), self._page_params(query, 0, page_size, fields), stream=True
+        )
+        total = first.headers.get("X-Total-Count")
+        next_url = first.links.get("next", {}).get("url")
+        page_count = 0
+        with first:
+            for rec in unseen(iter_result_records(first)):
+                page_count += 1
+                yield rec
+
+        if total is not None:
+            total = min(int(total), limit) if limit else int(total)
+            # Keep up to max_concurrency pages in flight, yielding them in order.
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+                in_flight = deque()
+                for offset in range(page_size, total, page_size):
+                    in_flight.append(pool.submit(
+                        self.fetch_page, query, offset, min(page_size, total - offset), fields
+                    ))
+                    if len(in_flight) >= self.max_concurrency:
+                        yield from unseen(in_flight.popleft().result())
+                while in_flight:
+                    yield from unseen(in_flight.popleft().result())
+            return
+
+        # No total reported: follow the Link header, or step the offset until
+        # a page comes back empty.
+        count = page_count
+        offset = 0
+        while (page_count or next_url) and (not limit or count < limit):
+            offset += page_size
+            if next_url:
+                response = self._get(next_url, stream=True)
+            else:
+                response = self._get(
+                    self._base_url(), self._page_params(query, offset, page_size, fields), stream=True
+                )
+            next_url = response.links.get("next", {}).get("url")
+            page_count = 0
+            with response:
+                for rec in unseen(iter_result_records(response)):
+                    if limit and count >= limit:
+                        break
+                    count += 1
+                    page_count += 1
+                    yield rec
 
-    Returns a summary dict: {created: int, updated: int}
+    def fetch_applications(self, query: str | None = None, limit: int | None = None,
+                           fields: Iterable[str] | None = None) -> List[Dict[str, Any]]:
+        """
+        Fetch every matching application record (or at most `limit`) as a
+        list. Prefer iter_applications() for large tables.
+        """
+        return list(self.iter_applications(query=query, limit=limit, fields=fields))
+
+
+def incremental_query(query: str | None, updated_on: str, sys_id: str) -> str:
     """
-    client = ServiceNowClient()
-    records = client.fetch_applications(query=query)
+    Records changed after the (sys_updated_on, sys_id) watermark, i.e.
+    updated_on > W or (updated_on == W and sys_id > S). ^NQ ORs two complete
+    queries, so the division's own filter is repeated on both sides.
+    """
+    prefix = f"{query}^" if query else ""
+    return (
+        f"{prefix}sys_updated_on>{updated_on}"
+        f"^NQ{prefix}sys_updated_on={updated_on}^sys_id>{sys_id}"
+    )
+
 
-    created = 0
-    updated = 0
+def needs_full_sync(config: ServiceNowIntegrationConfig | None) -> bool:
+    """Full syncs run without a watermark and every SNOW_FULL_SYNC_INTERVAL_HOURS."""
+    if config is None or not config.watermark_updated_on or config.last_full_sync is None:
+        return True
+    interval = timedelta(hours=getattr(settings, "SNOW_FULL_SYNC_INTERVAL_HOURS", 168))
+    return timezone.now() - config.last_full_sync >= interval
 
+
+def _watermark(records: Iterable[Dict[str, Any]], current: tuple) -> tuple:
+    newest = current
     for rec in records:
-        # Map ServiceNow fields to your model fields
-        name = rec.get("name") or rec.get("u_application_name")
-        if not name:
-            continue
+        mark = (_raw(rec.get("sys_updated_on")), _raw(rec.get("sys_id")))
+        if mark[0] and mark > newest:
+            newest = mark
+    return newest
 
-        defaults = {
-            "description": rec.get("description", ""),
-            "hosting_environment": rec.get("u_hosting_environment", ""),
-            "recovery_tier": rec.get("u_recovery_tier", ""),
-            "rto": rec.get("u_rto", ""),
-            "vendor_contact": rec.get("u_vendor_contact", ""),
-            "dependencies": rec.get("u_dependencies", ""),
-            "workarounds": rec.get("u_workarounds", ""),
-        }
 
-        obj, created_flag = CriticalApplication.objects.update_or_create(
-            division=division,
-            name=name,
-            defaults=defaults,
+def _batches(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for rec in records:
+        batch.append(rec)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ApplicationReconciler:
+    """
+    Reconciles ServiceNow records with one division's CriticalApplication
+    rows (matched by name), a batch at a time. One query loads the existing
+    rows up front; each batch is diffed in memory and written with
+    bulk_create/bulk_update in its own transaction, skipping rows whose mapped
+    fields already match. finish() deletes previously synced rows (those with
+    a snow_sys_id) that never appeared, when delete_missing is set.
+    """
+
+    def __init__(self, division: Division, field_map: Dict[str, tuple], delete_missing: bool = False,
+                 names: Iterable[str] | None = None):
+        self.division = division
+        self.field_map = field_map
+        self.fields = [f for f in field_map if f != "name"]
+        self.delete_missing = delete_missing
+        self.batch_size = getattr(settings, "SNOW_BULK_BATCH_SIZE", 500)
+        self.existing: Dict[str, CriticalApplication] = {}
+        existing = CriticalApplication.objects.filter(division=division).order_by("pk")
+        if names is not None:
+            # Only the rows a known set of records can touch (one page, say).
+            existing = existing.filter(name__in=list(names))
+        for app in existing:
+            self.existing.setdefault(app.name, app)
+        self.seen = set()
+        self.counts = {"created": 0, "updated": 0, "unchanged": 0, "deleted": 0, "total": 0}
+
+    def apply(self, records: List[Dict[str, Any]]):
+        incoming: Dict[str, Dict[str, str]] = {}
+        for rec in records:
+            self.counts["total"] += 1
+            values = map_record(rec, self.field_map)
+            name = values.pop("name")
+            if name:
+                # A name seen twice in one batch: the later record wins.
+                incoming[name] = values
+
+        to_create = []
+        to_update = []
+        for name, values in incoming.items():
+            self.seen.add(name)
+            app = self.existing.get(name)
+            if app is None:
+                to_create.append(CriticalApplication(division=self.division, name=name, **values))
+            elif any(getattr(app, f) != values[f] for f in self.fields):
+                for f in self.fields:
+                    setattr(app, f, values[f])
+                to_update.append(app)
+            else:
+                self.counts["unchanged"] += 1
+
+        with transaction.atomic():
+            if to_create:
+                CriticalApplication.objects.bulk_create(to_create, batch_size=self.batch_size)
+                # bulk_create sends no post_save, and new rows change the dashboard counts.
+                invalidate_leadership_dashboard()
+            if to_update:
+                CriticalApplication.objects.bulk_update(to_update, self.fields, batch_size=self.batch_size)
+            if to_create or to_update:
+                # Nor does bulk_update; either can change the list's filter options.
+                invalidate_filter_options(CriticalApplication, self.division.pk)
+
+        # Later batches then see these as existing rows.
+        for app in to_create:
+            self.existing.setdefault(app.name, app)
+        self.counts["created"] += len(to_create)
+        self.counts["updated"] += len(to_update)
+
+    def finish(self) -> dict:
+        """Apply deletions (if enabled) and return {created, updated, unchanged, deleted, total}."""
+        if self.delete_missing:
+            self.counts["deleted"] = delete_unseen_applications(self.division, self.seen)
+        return dict(self.counts)
+
+
+def delete_unseen_applications(division: Division, seen_names: Iterable[str]) -> int:
+    """
+    Delete the division's previously synced applications (those with a
+    snow_sys_id) whose names are not in `seen_names`. Returns the count.
+    """
+    seen_names = set(seen_names)
+    batch_size = getattr(settings, "SNOW_BULK_BATCH_SIZE", 500)
+    to_delete = [
+        pk for pk, name in (
+            CriticalApplication.objects
+            .filter(division=division)
+            .exclude(snow_sys_id="")
+            .values_list("pk", "name")
         )
+        if name not in seen_names
+    ]
+    with transaction.atomic():
+        for start in range(0, len(to_delete), batch_size):
+            CriticalApplication.objects.filter(pk__in=to_delete[start:start + batch_size]).delete()
+    return len(to_delete)
+
+
+def upsert_critical_applications(division: Division, records: Iterable[Dict[str, Any]],
+                                 field_map: Dict[str, tuple], delete_missing: bool = False) -> dict:
+    """
+    Reconcile ServiceNow records with the division's CriticalApplication rows,
+    consuming `records` (which may be a generator) in SNOW_SYNC_BATCH_SIZE
+    batches. See ApplicationReconciler.
+
+    Returns {created, updated, unchanged, deleted, total}.
+    """
+    reconciler = ApplicationReconciler(division, field_map, delete_missing=delete_missing)
+    for batch in _batches(records, getattr(settings, "SNOW_SYNC_BATCH_SIZE", 1000)):
+        reconciler.apply(batch)
+    return reconciler.finish()
+
+
+def connection_key(config: ServiceNowIntegrationConfig | None = None) -> tuple:
+    """
+    (instance_url, username, password, table) for a division's config, with
+    blank fields falling back to the global SNOW_* settings.
+    """
+    return (
+        (getattr(config, "instance_url", "") or settings.SNOW_INSTANCE_URL).rstrip("/"),
+        getattr(config, "username", "") or settings.SNOW_USERNAME,
+        getattr(config, "password", "") or settings.SNOW_PASSWORD,
+        getattr(config, "app_table", "") or getattr(settings, "SNOW_APP_TABLE", "cmdb_ci_service"),
+    )
+
+
+_clients: Dict[tuple, ServiceNowClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(config: ServiceNowIntegrationConfig | None = None) -> ServiceNowClient:
+    """
+    Process-wide client for the config's instance and credentials, so every
+    division on the same instance shares one connection pool.
+    """
+    key = connection_key(config)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = ServiceNowClient(*key)
+            _clients[key] = client
+        return client
+
+
+def _fetch_plan(config: ServiceNowIntegrationConfig | None, query: str | None,
+                full: bool) -> tuple:
+    """(sysparm_query to fetch, whether this is a full sync) for one division."""
+    if config is not None and query is None:
+        query = config.query or None
+    full = full or needs_full_sync(config)
+    if full:
+        return query, True
+    return incremental_query(query, config.watermark_updated_on, config.watermark_sys_id), False
+
+
+def _fetch_columns(field_map: Dict[str, tuple]) -> List[str]:
+    columns = snow_columns(field_map)
+    return columns + [c for c in WATERMARK_COLUMNS if c not in columns]
 
-        if created_flag:
-            created += 1
-        else:
-            updated += 1
 
-    return {"created": created, "updated": updated, "total": len(records)}
+def _save_watermark(config: ServiceNowIntegrationConfig, watermark: tuple, full: bool):
+    config.watermark_updated_on, config.watermark_sys_id = watermark
+    update_fields = ["watermark_updated_on", "watermark_sys_id"]
+    if full:
+        config.last_full_sync = timezone.now()
+        update_fields.append("last_full_sync")
+    config.save(update_fields=update_fields)
+
+
+def sync_critical_applications_from_servicenow(division: Division, query: str | None = None,
+                                               config: ServiceNowIntegrationConfig | None = None,
+                                               full: bool = False) -> dict:
+    """
+    Pulls applications from ServiceNow and upserts them into CriticalApplication
+    for the given division, using the instance and credentials from its config.
+
+    With a config, only records changed since its watermark are fetched,
+    unless `full` is set or a periodic full sync is due; full syncs also
+    delete applications that have disappeared from ServiceNow. The config's
+    watermark is advanced after the changes are saved. Without a config
+    (an ad hoc query) every match is fetched and nothing is deleted.
+
+    Returns a summary dict: {mode, created, updated, unchanged, deleted, total}
+    """
+    fetch_query, full = _fetch_plan(config, query, full)
+    field_map = get_field_map()
+    records = get_client(config).iter_applications(query=fetch_query, fields=_fetch_columns(field_map))
+
+    reconciler = ApplicationReconciler(division, field_map, delete_missing=full and config is not None)
+    watermark = (config.watermark_updated_on, config.watermark_sys_id) if config else ("", "")
+    for batch in _batches(records, getattr(settings, "SNOW_SYNC_BATCH_SIZE", 1000)):
+        reconciler.apply(batch)
+        watermark = _watermark(batch, watermark)
+
+    summary = reconciler.finish()
+    summary["mode"] = "full" if full else "incremental"
+    # Only advanced once every batch is saved, so a failed sync is retried in full.
+    if config is not None:
+        _save_watermark(config, watermark, full)
+    return summary
+
+
+def begin_paged_sync(config: ServiceNowIntegrationConfig, full: bool = False) -> dict:
+    """
+    Starting point for a sync driven one page at a time (by a durable
+    workflow, say): {query, full, page_size}. Plain values only, so the
+    result can be checkpointed.
+    """
+    fetch_query, full = _fetch_plan(config, None, full)
+    return {"query": fetch_query, "full": full, "page_size": get_client(config).page_size}
+
+
+def sync_page(config: ServiceNowIntegrationConfig, query: str | None, offset: int,
+              page_size: int, run_id: str) -> dict:
+    """
+    Fetch the page at `offset`, apply it to the config's division and record
+    its sys_ids as seen by `run_id`. Re-running a page is harmless: rows it
+    already wrote come back unchanged, and seen records are recorded once.
+
+    Returns {fetched, total, created, updated, unchanged, watermark}, where
+    `total` is the X-Total-Count ServiceNow reported for the whole query.
+    """
+    field_map = get_field_map()
+    records, total = get_client(config).fetch_page_and_total(
+        query, offset, page_size, _fetch_columns(field_map)
+    )
+    names = [map_record(rec, {"name": field_map["name"]})["name"] for rec in records]
+    ServiceNowSyncRecord.objects.bulk_create(
+        [
+            ServiceNowSyncRecord(run_id=run_id, sys_id=_raw(rec.get("sys_id")), name=name)
+            for rec, name in zip(records, names)
+            if _raw(rec.get("sys_id"))
+        ],
+        batch_size=getattr(settings, "SNOW_BULK_BATCH_SIZE", 500),
+        ignore_conflicts=True,
+    )
+    reconciler = ApplicationReconciler(config.division, field_map, names=names)
+    reconciler.apply(records)
+    counts = reconciler.finish()
+    return {
+        "fetched": len(records),
+        "total": total,
+        "created": counts["created"],
+        "updated": counts["updated"],
+        "unchanged": counts["unchanged"],
+        "watermark": list(_watermark(records, ("", ""))),
+    }
+
+
+def finish_paged_sync(config: ServiceNowIntegrationConfig, run_id: str, full: bool,
+                      watermark: Iterable[str], total: int | None) -> dict:
+    """
+    Complete a paged sync run: returns {deleted, complete}.
+
+    The run is complete when the distinct sys_ids its pages recorded match
+    the X-Total-Count ServiceNow reported (`total`); equal page counts alone
+    don't prove it, since a row shifting between offsets can be read twice
+    while another is skipped. Only a complete run advances the watermark,
+    and on a full sync deletes the applications it didn't see. Otherwise
+    the missed records are read again next time. The run's seen records are
+    cleared either way.
+    """
+    seen = ServiceNowSyncRecord.objects.filter(run_id=run_id)
+    try:
+        complete = total is not None and seen.count() == total
+        deleted = 0
+        if complete:
+            if full:
+                deleted = delete_unseen_applications(
+                    config.division, seen.values_list("name", flat=True).iterator()
+                )
+            current = (config.watermark_updated_on, config.watermark_sys_id)
+            _save_watermark(config, max(current, tuple(watermark)), full)
+        return {"deleted": deleted, "complete": complete}
+    finally:
+        seen.delete()
+
+
+def group_configs_for_sync(configs: Iterable[ServiceNowIntegrationConfig],
+                           full: bool = False) -> List[List[ServiceNowIntegrationConfig]]:
+    """
+    Groups configs that can be served by one scan: same instance, credentials
+    and table, and the same fetch query (e.g. divisions sharing a filter, on
+    a full sync). Groups come back in the order of their first config.
+    """
+    groups: Dict[tuple, List[ServiceNowIntegrationConfig]] = {}
+    for config in configs:
+        key = (connection_key(config), *_fetch_plan(config, None, full))
+        groups.setdefault(key, []).append(config)
+    return list(groups.values())
+
+
+def sync_config_group(configs: List[ServiceNowIntegrationConfig], full: bool = False) -> List[dict]:
+    """
+    Syncs a group from group_configs_for_sync() with a single paginated scan,
+    applying each batch of records to every division in the group. A failure
+    applying one division does not affect the others.
+
+    Returns one {config, summary, error} dict per config.
+    """
+    fetch_query, full = _fetch_plan(configs[0], None, full)
+    field_map = get_field_map()
+    errors: Dict[int, str] = {}
+    reconcilers = {}
+    for config in configs:
+        try:
+            reconcilers[config.pk] = ApplicationReconciler(config.division, field_map, delete_missing=full)
+        except Exception as exc:
+            errors[config.pk] = str(exc)
+
+    watermark = (configs[0].watermark_updated_on, configs[0].watermark_sys_id)
+    try:
+        records = get_client(configs[0]).iter_applications(
+            query=fetch_query, fields=_fetch_columns(field_map)
+        )
+        for batch in _batches(records, getattr(settings, "SNOW_SYNC_BATCH_SIZE", 1000)):
+            for pk, reconciler in list(reconcilers.items()):
+                try:
+                    reconciler.apply(batch)
+                except Exception as exc:
+                    errors[pk] = str(exc)
+                    del reconcilers[pk]
+            watermark = _watermark(batch, watermark)
+    except Exception as exc:
+        # The scan itself failed: nothing finished, no watermark moves.
+        for pk in reconcilers:
+            errors[pk] = str(exc)
+        reconcilers = {}
+
+    results = []
+    for config in configs:
+        if config.pk in errors:
+            results.append({"config": config, "summary": None, "error": errors[config.pk]})
+            continue
+        try:
+            summary = reconcilers[config.pk].finish()
+            summary["mode"] = "full" if full else "incremental"
+            _save_watermark(config, watermark, full)
+            results.append({"config": config, "summary": summary, "error": None})
+        except Exception as exc:
+            results.append({"config": config, "summary": None, "error": str(exc)})
+    return results
@@ -0,0 +1,306 @@
+"""
+Local emulator for the subset of the ServiceNow Table API the integration uses.
+
+Serves GET /api/now/table/<table> over synthetic CMDB records with:
+    sysparm_query    conditions joined by ^, OR-ed queries joined by ^NQ,
+                     operators = != > >= < <= LIKE STARTSWITH,
+                     ORDERBY<field> / ORDERBYDESC<field>
+    sysparm_limit / sysparm_offset, plus X-Total-Count and a Link rel="next"
+    sysparm_fields, sysparm_exclude_reference_link, sysparm_display_value
+and optional fault injection: a fixed latency per request and a fraction of
+requests answered with 429 + Retry-After.
+
+It has no Django dependency, so it can be run on its own:
+
+    python servicenow_emulator.py --records 10000 --port 8099 --rate-429 0.05
+
+and pointed at with SNOW_INSTANCE_URL=http://127.0.0.1:8099.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+_TABLE_PATH = re.compile(r"^/api/now/table/(?P<table>[\w.]+)$")
+_CONDITION = re.compile(r"^(?P<field>\w+)(?P<op>!=|>=|<=|=|>|<|LIKE|STARTSWITH)(?P<value>.*)$")
+
+HOSTING = ("On-Prem", "SaaS", "AWS", "Azure", "Colo")
+TIERS = ("Tier 0", "Tier 1", "Tier 2", "Tier 3")
+RTOS = ("1h", "4h", "8h", "24h", "72h")
+SUPPORT_GROUPS = ("Service Desk", "Infrastructure", "Applications", "Network", "Database")
+
+
+def synthetic_cmdb_records(count: int, seed: int = 0) -> list:
+    """
+    `count` application CIs shaped like cmdb_ci_service rows. Besides the
+    columns the sync maps, each carries unmapped columns and a reference
+    field so projection and reference-link handling have something to trim.
+    """
+    rng = random.Random(seed)
+    base = datetime(2025, 1, 1)
+    records = []
+    for i in range(count):
+        group = rng.randrange(len(SUPPORT_GROUPS))
+        records.append({
+            "sys_id": hashlib.md5(f"{seed}-{i}".encode()).hexdigest(),
+            "name": f"Application {i:06d}",
+            "u_application_name": f"APP-{i:06d}",
+            "description": f"Synthetic application {i} " + "lorem ipsum " * rng.randint(1, 20),
+            "u_hosting_environment": rng.choice(HOSTING),
+            "u_recovery_tier": rng.choice(TIERS),
+            "u_rto": rng.choice(RTOS),
+            "u_vendor_contact": f"vendor{rng.randrange(500)}@example.com",
+            "u_dependencies": ", ".join(f"APP-{rng.randrange(count):06d}" for _ in range(rng.randint(0, 3))),
+            "u_workarounds": "Manual processing" if i % 3 == 0 else "",
+            "short_description": f"Application {i}",
+            "operational_status": str(rng.randint(1, 6)),
+            "sys_created_by": "admin",
+            "sys_class_name": "cmdb_ci_service",
+            "sys_updated_on": (base + timedelta(minutes=rng.randrange(500_000))).strftime("%Y-%m-%d %H:%M:%S"),
+            "support_group": {
+                "value": hashlib.md5(f"group-{group}".encode()).hexdigest(),
+                "display_value": SUPPORT_GROUPS[group],
+            },
+        })
+    return records
+
+
+def _compare(actual: str, op: str, expected: str) -> bool:
+    if op == "=":
+        return actual == expected
+    if op == "!=":
+        return actual != expected
+    if op == ">":
+        return actual > expected
+    if op == ">=":
+        return actual >= expected
+    if op == "<":
+        return actual < expected
+    if op == "<=":
+        return actual <= expected
+    if op == "LIKE":
+        return expected.lower() in actual.lower()
+    return actual.lower().startswith(expected.lower())
+
+
+def _scalar(value) -> str:
+    return value["value"] if isinstance(value, dict) else (value or "")
+
+
+def parse_query(query: str) -> tuple:
+    """Returns ([[(field, op, value), ...] per ^NQ branch], [(field, descending), ...])."""
+    branches = []
+    ordering = []
+    for branch in (query or "").split("^NQ"):
+        conditions = []
+        for term in branch.split("^"):
+            if not term:
+                continue
+            if term.startswith("ORDERBYDESC"):
+                ordering.append((term[len("ORDERBYDESC"):], True))
+            elif term.startswith("ORDERBY"):
+                ordering.append((term[len("ORDERBY"):], False))
+            else:
+                match = _CONDITION.match(term)
+                if not match:
+                    raise ValueError(f"Unsupported query term: {term}")
+                conditions.append((match["field"], match["op"], match["value"]))
+        branches.append(conditions)
+    return [b for b in branches if b], ordering
+
+
+def filter_records(records: list, query: str) -> list:
+    branches, ordering = parse_query(query)
+    if branches:
+        records = [
+            rec for rec in records
+            if any(all(_compare(_scalar(rec.get(f)), op, v) for f, op, v in branch) for branch in branches)
+        ]
+    for field, descending in reversed(ordering):
+        records = sorted(records, key=lambda rec: _scalar(rec.get(field)), reverse=descending)
+    return records
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections is routine, not an error.
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class TableAPIEmulator:
+    """
+    In-process Table API server. Use as a context manager, or start()/stop().
+    `stats` counts requests served, 429s injected and records returned.
+    """
+
+    def __init__(self, records: list, latency: float = 0.0, rate_429: float = 0.0,
+                 retry_after: float = 1, host: str = "127.0.0.1", port: int = 0,
+                 max_limit: int = 10000, seed: int = 0):
+        self.records = records
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.max_limit = max_limit
+        self.stats = {"requests": 0, "throttled": 0, "records_served": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # Every page of a scan repeats the same query; filter and sort it once.
+        self._last_query = None
+        self._last_matches = None
+        self._server = _Server((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _should_throttle(self) -> bool:
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.rate_429 and self._rng.random() < self.rate_429:
+                self.stats["throttled"] += 1
+                return True
+            return False
+
+    def _matches(self, query: str) -> list:
+        with self._lock:
+            if query == self._last_query:
+                return self._last_matches
+        matches = filter_records(self.records, query)
+        with self._lock:
+            self._last_query, self._last_matches = query, matches
+        return matches
+
+    def render(self, path: str, params: dict) -> tuple:
+        """(status, headers, body) for a table path and a dict of query parameters."""
+        query = params.get("sysparm_query", "")
+        try:
+            matches = self._matches(query)
+        except ValueError as exc:
+            return 400, {}, {"error": {"message": str(exc)}}
+
+        offset = int(params.get("sysparm_offset", 0))
+        limit = min(int(params.get("sysparm_limit", self.max_limit)), self.max_limit)
+        page = matches[offset:offset + limit]
+
+        fields = [f for f in params.get("sysparm_fields", "").split(",") if f]
+        display = params.get("sysparm_display_value", "false")
+        exclude_links = params.get("sysparm_exclude_reference_link", "false") == "true"
+        result = [self._project(rec, fields, display, exclude_links) for rec in page]
+
+        headers = {"X-Total-Count": str(len(matches))}
+        if offset + limit < len(matches):
+            next_params = dict(params, sysparm_offset=str(offset + limit))
+            headers["Link"] = f'<{self.url}{path}?{urlencode(next_params)}>;rel="next"'
+        with self._lock:
+            self.stats["records_served"] += len(result)
+        return 200, headers, {"result": result}
+
+    def _project(self, rec: dict, fields: list, display: str, exclude_links: bool) -> dict:
+        out = {}
+        for field in fields or rec:
+            value = rec.get(field, "")
+            if isinstance(value, dict):
+                if display == "all":
+                    value = {"display_value": value["display_value"], "value": value["value"]}
+                else:
+                    raw = value["display_value"] if display == "true" else value["value"]
+                    value = raw if exclude_links else {
+                        "link": f"{self.url}/api/now/table/sys_user_group/{value['value']}",
+                        "value": raw,
+                    }
+            elif display == "all":
+                value = {"display_value": value, "value": value}
+            out[field] = value
+        return out
+
+    def _handler_class(self):
+        emulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, headers, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if emulator.latency:
+                    time.sleep(emulator.latency)
+                parsed = urlparse(self.path)
+                if not _TABLE_PATH.match(parsed.path):
+                    self._send(404, {}, {"error": {"message": "No such table API path"}})
+                    return
+                if emulator._should_throttle():
+                    self._send(429, {"Retry-After": str(emulator.retry_after)},
+                               {"error": {"message": "Too many requests"}})
+                    return
+                params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+                self._send(*emulator.render(parsed.path, params))
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local ServiceNow Table API emulator")
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1)
+    args = parser.parse_args()
+
+    emulator = TableAPIEmulator(
+        synthetic_cmdb_records(args.records, seed=args.seed),
+        latency=args.latency, rate_429=args.rate_429, retry_after=args.retry_after,
+        host=args.host, port=args.port, seed=args.seed,
+    )
+    print(f"Serving {args.records} records at {emulator.url}/api/now/table/<table>")
+    try:
+        emulator._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import resource
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from app.models import Division, ServiceNowIntegrationConfig
+from app.integrations.servicenow import sync_critical_applications_from_servicenow
+from app.integrations.servicenow_emulator import TableAPIEmulator, synthetic_cmdb_records
+
+
+class _QueryCounter:
+    """connection.execute_wrapper hook counting every SQL statement issued."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux; it is a high-water mark for the process.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark end-to-end ServiceNow sync against the local Table API emulator. "
+        "Creates a throwaway division in the configured database and deletes it afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--records", type=int, nargs="+", default=[100, 10000, 100000],
+            help="Table sizes to sync (default: 100 10000 100000)",
+        )
+        parser.add_argument("--page-size", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=4, help="Pages fetched at once")
+        parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every emulator request")
+        parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+        parser.add_argument("--keep", action="store_true", help="Keep the benchmark divisions")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'records':>8}  {'run':<12}  {'seconds':>8}  {'records/s':>10}  "
+            f"{'HTTP':>6}  {'429s':>5}  {'SQL':>7}  {'peak RSS':>9}"
+        )
+        # Peak RSS only ever grows, so run the sizes smallest first.
+        for count in sorted(options["records"]):
+            emulator = TableAPIEmulator(
+                synthetic_cmdb_records(count),
+                latency=options["latency"],
+                rate_429=options["rate_429"],
+                retry_after=0.1,
+            )
+            with emulator, override_settings(
+                SNOW_PAGE_SIZE=options["page_size"],
+                SNOW_MAX_CONCURRENCY=options["concurrency"],
+                SNOW_RATE_LIMIT=0,
+            ):
+                division = Division.objects.create(name=f"ServiceNow benchmark {uuid.uuid4().hex[:8]}")
+                config = ServiceNowIntegrationConfig.objects.create(
+                    division=division,
+                    enabled=False,
+                    instance_url=emulator.url,
+                    username="benchmark",
+                    password="benchmark",
+                )
+                try:
+                    # A full load into an empty division, then a resync that
+                    # finds nothing changed since the watermark.
+                    self._run(count, "full (empty)", emulator, division, config, full=True)
+                    self._run(count, "full (same)", emulator, division, config, full=True)
+                    self._run(count, "incremental", emulator, division, config, full=False)
+                finally:
+                    if not options["keep"]:
+                        division.delete()
+
+    def _run(self, count, label, emulator, division, config, full):
+        requests_before = emulator.stats["requests"]
+        throttled_before = emulator.stats["throttled"]
+        counter = _QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            summary = sync_critical_applications_from_servicenow(division, config=config, full=full)
+        elapsed = time.perf_counter() - started
+
+        rate = summary["total"] / elapsed if elapsed else 0
+        self.stdout.write(
+            f"{count:>8}  {label:<12}  {elapsed:>7.2f}s  {rate:>10,.0f}  "
+            f"{emulator.stats['requests'] - requests_before:>6}  "
+            f"{emulator.stats['throttled'] - throttled_before:>5}  "
+            f"{counter.count:>7}  {_peak_rss_mb():>7.0f}MB"
+        )
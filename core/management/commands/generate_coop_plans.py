@@ -0,0 +1,79 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from app.models import Division
+from app.services.bulk_plans import generate_plans_in_parallel
+
+
+class Command(BaseCommand):
+    help = "Generate COOP plans for all (or a filtered set of) divisions in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--division", type=int, action="append", dest="division_ids",
+            help="Division ID to generate (repeatable). Defaults to all divisions.",
+        )
+        parser.add_argument("--status", help="Only divisions with this plan_status")
+        parser.add_argument("--name-contains", help="Only divisions whose name contains this text")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 2,
+            help="Number of rendering processes (default: CPU count)",
+        )
+        parser.add_argument(
+            "--pdf-concurrency", type=int,
+            default=getattr(settings, "COOP_PDF_CONVERSION_CONCURRENCY", 2),
+            help="Maximum PDF conversions running at once across all workers",
+        )
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Regenerate even when division data is unchanged",
+        )
+
+    def handle(self, *args, **options):
+        divisions = Division.objects.order_by("name")
+        if options["division_ids"]:
+            divisions = divisions.filter(pk__in=options["division_ids"])
+        if options["status"]:
+            divisions = divisions.filter(plan_status=options["status"])
+        if options["name_contains"]:
+            divisions = divisions.filter(name__icontains=options["name_contains"])
+
+        names = dict(divisions.values_list("pk", "name"))
+        if not names:
+            self.stdout.write(self.style.WARNING("No divisions matched."))
+            return
+
+        self.stdout.write(
+            f"Generating plans for {len(names)} division(s) "
+            f"with {options['workers']} worker(s), "
+            f"{options['pdf_concurrency']} concurrent PDF conversion(s)."
+        )
+
+        def report(result):
+            name = names.get(result["division_id"], result["division_id"])
+            if not result["success"]:
+                self.stdout.write(self.style.ERROR(f"  {name}: FAILED — {'; '.join(result['errors'])}"))
+            elif result["reused"]:
+                self.stdout.write(f"  {name}: unchanged, kept v{result['version']} ({result['seconds']:.1f}s)")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"  {name}: v{result['version']} ({result['seconds']:.1f}s)"))
+
+        results, elapsed = generate_plans_in_parallel(
+            list(names),
+            workers=options["workers"],
+            pdf_concurrency=options["pdf_concurrency"],
+            force=options["force"],
+            on_result=report,
+        )
+
+        generated = sum(1 for r in results if r["success"] and not r["reused"])
+        reused = sum(1 for r in results if r["success"] and r["reused"])
+        failed = sum(1 for r in results if not r["success"])
+        rate = len(results) / elapsed * 60 if elapsed else 0
+
+        summary = (
+            f"Done in {elapsed:.1f}s: {generated} generated, {reused} unchanged, "
+            f"{failed} failed ({rate:.1f} divisions/min)."
+        )
+        self.stdout.write(self.style.ERROR(summary) if failed else self.style.SUCCESS(summary))
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from app.services.plan_retention import RetentionPolicy, apply_retention, plan_retention
+
+
+def _human_bytes(count):
+    for unit in ("B", "KB", "MB"):
+        if count < 1024:
+            return f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+
+class Command(BaseCommand):
+    help = "Apply the GeneratedPlan retention policy and reclaim artifact storage"
+
+    def add_arguments(self, parser):
+        defaults = RetentionPolicy.from_settings()
+        parser.add_argument(
+            "--keep-last", type=int, default=defaults.keep_last,
+            help=f"Plans to keep per division (default: {defaults.keep_last})",
+        )
+        parser.add_argument(
+            "--no-keep-approved", dest="keep_approved", action="store_false",
+            default=defaults.keep_approved,
+            help="Do not automatically keep plans generated while Approved",
+        )
+        parser.add_argument(
+            "--no-keep-monthly", dest="keep_monthly", action="store_false",
+            default=defaults.keep_monthly,
+            help="Do not keep the newest plan of each month",
+        )
+        parser.add_argument(
+            "--division", type=int, action="append", dest="division_ids",
+            help="Limit to this division ID (repeatable)",
+        )
+        parser.add_argument(
+            "--pdf-only", action="store_true",
+            help="Keep expired history rows and Word documents; only remove their PDFs",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report what would be removed and reclaimed without changing anything",
+        )
+
+    def handle(self, *args, **options):
+        policy = RetentionPolicy(
+            keep_last=options["keep_last"],
+            keep_approved=options["keep_approved"],
+            keep_monthly=options["keep_monthly"],
+        )
+        report = plan_retention(policy, options["division_ids"], pdf_only=options["pdf_only"])
+
+        action = "strip PDFs from" if options["pdf_only"] else "delete"
+        self.stdout.write(
+            f"Policy: keep last {policy.keep_last}, "
+            f"approved={'yes' if policy.keep_approved else 'no'}, "
+            f"monthly={'yes' if policy.keep_monthly else 'no'}."
+        )
+        self.stdout.write(
+            f"{len(report.expired_ids)} plan(s) to {action}, {report.kept} kept; "
+            f"{len(report.freed_names)} file(s), {_human_bytes(report.reclaimed_bytes)} reclaimable."
+        )
+
+        if options["dry_run"] or not report.expired_ids:
+            if options["dry_run"]:
+                self.stdout.write(self.style.WARNING("Dry run — nothing changed."))
+            return
+
+        apply_retention(report, pdf_only=options["pdf_only"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Reclaimed {_human_bytes(report.reclaimed_bytes)}.")
+        )
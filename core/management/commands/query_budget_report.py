@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, reverse
+from app import urls as app_urls
+from app.models import Division
+from app.query_budget import QueryRecorder, budget_for
+from app.request_division import PK_MODELS
+
+# Routes with side effects on GET, or needing arguments we cannot invent.
+SKIP_ROUTES = {
+    "sync_critical_applications_servicenow",
+    "generate_coop_plan",
+    "coop_plan_job_status",
+    "coop_plan_job_status_api",
+}
+
+
+class Command(BaseCommand):
+    help = "GET every app route as a given user and rank them by SQL queries issued"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", required=True, help="User to request the pages as")
+        parser.add_argument(
+            "--division", type=int,
+            help="Division to use for division routes (default: the one with the most essential functions)",
+        )
+        parser.add_argument("--top", type=int, default=0, help="Only show the N worst routes")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}")
+
+        division = self._division(options["division"])
+        if division is None:
+            raise CommandError("No divisions to report on.")
+
+        client = Client()
+        client.force_login(user)
+
+        rows = []
+        for pattern in app_urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name or pattern.name in SKIP_ROUTES:
+                continue
+            url = self._url(pattern, division)
+            if url is None:
+                rows.append((pattern.name, "-", None, None, [], "no sample row"))
+                continue
+            # Run the view as-is: no budget enforcement while measuring.
+            with override_settings(
+                COOP_QUERY_BUDGET_STRICT=False,
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            ), QueryRecorder() as recorder:
+                response = client.get(url)
+            rows.append((
+                pattern.name, response.status_code, recorder.count,
+                budget_for(pattern.callback, pattern.name), recorder.repeated_shapes(), url,
+            ))
+
+        rows.sort(key=lambda row: row[2] or 0, reverse=True)
+        if options["top"]:
+            rows = rows[:options["top"]]
+
+        self.stdout.write(f"{'route':<40} {'status':>6} {'queries':>7} {'budget':>6} {'N+1':>4}  url")
+        for name, status, count, budget, repeated, url in rows:
+            over = budget is not None and count is not None and count > budget
+            line = (
+                f"{name:<40} {status!s:>6} {count if count is not None else '-'!s:>7} "
+                f"{budget if budget is not None else '-'!s:>6} {len(repeated):>4}  {url}"
+            )
+            self.stdout.write(self.style.ERROR(line) if over or repeated else line)
+            for shape, n in repeated[:3]:
+                self.stdout.write(f"{'':<8}{n} x {shape[:160]}")
+
+    def _division(self, division_id):
+        divisions = Division.objects.all()
+        if division_id:
+            return divisions.filter(pk=division_id).first()
+        return divisions.annotate(n=Count("essentialfunction")).order_by("-n", "pk").first()
+
+    def _url(self, pattern, division):
+        """A URL for the route using `division`, or a row of it for pk routes."""
+        params = pattern.pattern.converters
+        kwargs = {}
+        if "division_id" in params:
+            kwargs["division_id"] = division.pk
+        if "pk" in params:
+            model = PK_MODELS.get(pattern.name)
+            if model is None:
+                return None
+            if model is Division:
+                kwargs["pk"] = division.pk
+            else:
+                pk = model.objects.filter(division=division).values_list("pk", flat=True).first()
+                if pk is None:
+                    return None
+                kwargs["pk"] = pk
+        if "kind" in params:
+            kwargs["kind"] = "docx"
+        if set(params) - set(kwargs):
+            return None
+        return reverse(pattern.name, kwargs=kwargs)
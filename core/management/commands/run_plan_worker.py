@@ -0,0 +1,25 @@
+import threading
+
+from dbos import DBOS
+from django.core.management.base import BaseCommand
+from app.plan_workflows import launch_dbos
+from app.services.coop_plan import get_plan_template
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the DBOS queue worker for COOP plan generation and durable "
+        "ServiceNow syncs. Runs until interrupted."
+    )
+
+    def handle(self, *args, **options):
+        # Parse the plan template up front so the first job doesn't pay for it.
+        get_plan_template()
+        launch_dbos(worker=True)
+        self.stdout.write(self.style.SUCCESS("Plan worker running; Ctrl+C to stop."))
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            DBOS.destroy()
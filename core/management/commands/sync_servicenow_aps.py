@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from app.models import Division, ServiceNowIntegrationConfig
+from django.utils import timezone
+from app.integrations.servicenow import group_configs_for_sync, sync_config_group
+
+
+class Command(BaseCommand):
+    help = "Sync Critical Applications from ServiceNow for all enabled divisions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Re-read every record instead of changes since the last sync, "
+                 "and remove applications deleted in ServiceNow.",
+        )
+        parser.add_argument(
+            "--queue",
+            action="store_true",
+            help="Enqueue durable, resumable syncs for the DBOS workers instead of syncing here.",
+        )
+
+    def handle(self, *args, **options):
+        configs = ServiceNowIntegrationConfig.objects.filter(enabled=True).select_related("division")
+
+        if not configs.exists():
+            self.stdout.write(self.style.WARNING("No enabled ServiceNow integration configs found."))
+            return
+
+        if options["queue"]:
+            from app.plan_workflows import launch_dbos
+            from app.sync_workflows import enqueue_servicenow_sync
+
+            # Only enqueue; the run_plan_worker processes run the syncs.
+            launch_dbos(worker=False)
+            for config in configs:
+                job_id = enqueue_servicenow_sync(config.pk, full=options["full"])
+                self.stdout.write(f"Queued {config.division.name}: {job_id}")
+            return
+
+        # Divisions on the same instance with the same fetch query share a scan.
+        for group in group_configs_for_sync(configs, full=options["full"]):
+            names = ", ".join(config.division.name for config in group)
+            self.stdout.write(f"Syncing ServiceNow apps for division(s): {names}")
+
+            try:
+                results = sync_config_group(group, full=options["full"])
+            except Exception as exc:
+                # One group's failure doesn't stop the others.
+                results = [{"config": config, "summary": None, "error": str(exc)} for config in group]
+
+            for result in results:
+                division = result["config"].division
+                summary = result["summary"]
+                if not result["error"]:
+                    try:
+                        result["config"].last_sync = timezone.now()
+                        result["config"].save(update_fields=["last_sync"])
+                    except Exception as exc:
+                        result["error"] = f"saving sync status failed: {exc}"
+                if result["error"]:
+                    self.stdout.write(self.style.ERROR(f"Division {division.name}: FAILED — {result['error']}"))
+                    continue
+
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Division {division.name}: "
+                        f"{summary['created']} created, "
+                        f"{summary['updated']} updated, "
+                        f"{summary['unchanged']} unchanged, "
+                        f"{summary['deleted']} deleted "
+                        f"({summary['mode']}, {summary['total']} fetched)."
+                    )
+                )
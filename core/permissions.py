@@ -1,8 +1,47 @@
+from django.conf import settings
+from django.core.cache import cache
+
+ADMIN_GROUP = "COOP Admins"
+LEADERSHIP_GROUP = "Leadership"
+COORDINATOR_GROUP = "Coordinators"
+
+_ROLE_CACHE_KEY = "coop:user-groups:{}"
+
+
+def get_group_names(user):
+    """
+    The user's group names, loaded with one query and remembered on the user
+    object, which Django builds afresh for each request. With
+    COOP_ROLE_CACHE_TTL set they are also cached across requests for that
+    many seconds; membership changes invalidate the entry (see
+    invalidate_user_roles).
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    names = getattr(user, "_coop_group_names", None)
+    if names is not None:
+        return names
+
+    ttl = getattr(settings, "COOP_ROLE_CACHE_TTL", 0)
+    key = _ROLE_CACHE_KEY.format(user.pk)
+    names = cache.get(key) if ttl else None
+    if names is None:
+        names = frozenset(user.groups.values_list("name", flat=True))
+        if ttl:
+            cache.set(key, names, ttl)
+    user._coop_group_names = names
+    return names
+
+
+def invalidate_user_roles(*user_ids):
+    cache.delete_many([_ROLE_CACHE_KEY.format(pk) for pk in user_ids])
+
+
 def is_admin(user):
-    return user.is_authenticated and (user.is_superuser or user.groups.filter(name="COOP Admins").exists())
+    return user.is_authenticated and (user.is_superuser or ADMIN_GROUP in get_group_names(user))
 
 def is_leadership(user):
-    return user.is_authenticated and (user.is_superuser or user.groups.filter(name="Leadership").exists())
+    return user.is_authenticated and (user.is_superuser or LEADERSHIP_GROUP in get_group_names(user))
 
 def is_coordinator(user):
-    return user.is_authenticated and user.groups.filter(name="Coordinators").exists()
+    return user.is_authenticated and COORDINATOR_GROUP in get_group_names(user)
@@ -0,0 +1,83 @@
+"""
+Request-scoped Division lookup.
+
+The permission middleware, the current_division context processor and the
+views all need the Division a URL refers to. get_request_division() works it
+out from the resolved URL once, with the coordinator joined in, and keeps it
+on the request so the others reuse it.
+
+URLs name a division either directly (`division_id`, or `pk` on division
+pages) or through a child row's `pk` (e.g. essential-functions/<pk>/edit/);
+PK_MODELS says which model each such `pk` belongs to.
+"""
+from django.http import Http404
+
+from .models import (
+    Division, EssentialFunction, CriticalApplication, KeyPersonnel,
+    VitalRecord, Dependency, AlternateFacility, Communication,
+    RecoveryPriority, GeneratedPlan
+)
+
+# URL name -> model whose primary key the route's `pk` kwarg holds.
+PK_MODELS = {
+    "division_detail": Division,
+    "essential_function_edit": EssentialFunction,
+    "critical_application_edit": CriticalApplication,
+    "key_personnel_edit": KeyPersonnel,
+    "vital_record_edit": VitalRecord,
+    "dependency_edit": Dependency,
+    "alternate_facility_edit": AlternateFacility,
+    "communication_edit": Communication,
+    "recovery_priority_edit": RecoveryPriority,
+    "download_plan_artifact": GeneratedPlan,
+}
+
+_UNRESOLVED = object()
+
+
+def _resolve_division(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return None
+
+    divisions = Division.objects.select_related("coordinator")
+    kwargs = match.kwargs
+    if "division_id" in kwargs:
+        return divisions.filter(pk=kwargs["division_id"]).first()
+
+    model = PK_MODELS.get(match.url_name)
+    if model is None or "pk" not in kwargs:
+        return None
+    if model is Division:
+        return divisions.filter(pk=kwargs["pk"]).first()
+    # One query through the reverse relation, e.g. essentialfunction__pk.
+    return divisions.filter(**{f"{model._meta.model_name}__pk": kwargs["pk"]}).first()
+
+
+def get_request_division(request):
+    """The Division the current URL refers to, or None. Queried at most once per request."""
+    division = getattr(request, "_coop_division", _UNRESOLVED)
+    if division is _UNRESOLVED:
+        division = _resolve_division(request)
+        request._coop_division = division
+    return division
+
+
+def get_division_or_404(request, division_id):
+    """get_object_or_404(Division, pk=division_id), reusing the request's division."""
+    division = get_request_division(request)
+    if division is not None and division.pk == int(division_id):
+        return division
+    division = Division.objects.select_related("coordinator").filter(pk=division_id).first()
+    if division is None:
+        raise Http404("No Division matches the given query.")
+    return division
+
+
+def get_item_division(request, item):
+    """item.division, reusing the request's division when it is the same row."""
+    division = get_request_division(request)
+    if division is not None and division.pk == item.division_id:
+        item.division = division
+        return division
+    return item.division
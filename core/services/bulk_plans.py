@@ -0,0 +1,122 @@
+"""
+Bulk COOP plan generation across a process pool.
+
+Used by the `generate_coop_plans` management command to refresh plans for
+many divisions at once (e.g. before the annual review). Each division is
+rendered in its own worker process so python-docx work runs in parallel, a
+failure in one division never affects the others, and PDF conversions are
+capped across all workers by a shared semaphore.
+
+A worker process that dies (e.g. OOM during conversion) breaks the whole
+pool, failing every pending future with BrokenProcessPool. The divisions that
+had not finished are then resubmitted on a fresh pool; only a division caught
+in MAX_POOL_ATTEMPTS such crashes is reported as failed.
+
+Workers run django.setup(), which does not start DBOS (see apps.py), so pool
+workers never join the job queues.
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from django.db import connections
+
+MAX_POOL_ATTEMPTS = 3
+
+
+def _init_worker(pdf_slots):
+    import django
+    django.setup()
+
+    from app.services import coop_plan
+    coop_plan.set_pdf_conversion_slots(pdf_slots)
+
+
+def _generate_one(division_id, force):
+    from app.services.coop_plan import generate_coop_plan_for_division
+
+    started = time.monotonic()
+    try:
+        result = generate_coop_plan_for_division(division_id, force=force)
+    except Exception as exc:
+        result = {'success': False, 'errors': [str(exc)]}
+    finally:
+        connections.close_all()
+    plan = result.get('plan')
+    return {
+        'division_id': division_id,
+        'success': result['success'],
+        'version': plan.version if plan else None,
+        'reused': result.get('reused', False),
+        'errors': [str(e) for e in result.get('errors', [])],
+        'seconds': time.monotonic() - started,
+    }
+
+
+def generate_plans_in_parallel(division_ids, workers, pdf_concurrency, force=False, on_result=None):
+    """
+    Generate plans for `division_ids` using `workers` processes.
+
+    `on_result` is called in the parent with each per-division result dict as
+    it completes. Returns (results, elapsed_seconds).
+    """
+    # Forked workers must not share the parent's database sockets.
+    connections.close_all()
+
+    results = []
+    started = time.monotonic()
+
+    def finish(result):
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    attempts = dict.fromkeys(division_ids, 0)
+    pending = list(division_ids)
+    while pending:
+        crashed = []
+        # Fresh slots per pool: a worker that died mid-conversion never released its own.
+        pdf_slots = multiprocessing.BoundedSemaphore(pdf_concurrency)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(pdf_slots,),
+        ) as executor:
+            futures = {
+                executor.submit(_generate_one, division_id, force): division_id
+                for division_id in pending
+            }
+            for future in as_completed(futures):
+                division_id = futures[future]
+                try:
+                    finish(future.result())
+                except BrokenProcessPool:
+                    # Some worker died; this division may or may not be the cause.
+                    attempts[division_id] += 1
+                    crashed.append(division_id)
+                except Exception as exc:
+                    finish(_failed(division_id, f'Worker failed: {exc}'))
+
+        pending = []
+        for division_id in crashed:
+            if attempts[division_id] < MAX_POOL_ATTEMPTS:
+                pending.append(division_id)
+            else:
+                finish(_failed(
+                    division_id,
+                    f'Worker process died {MAX_POOL_ATTEMPTS} times while this division was pending',
+                ))
+
+    return results, time.monotonic() - started
+
+
+def _failed(division_id, error):
+    return {
+        'division_id': division_id,
+        'success': False,
+        'version': None,
+        'reused': False,
+        'errors': [error],
+        'seconds': None,
+    }
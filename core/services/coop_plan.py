@@ -5,40 +5,150 @@ Service module for generating COOP plans (Word + PDF)
 from docx import Document
 from docx.shared import Inches, Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from datetime import datetime
+from datetime import date, datetime
+import copy
+import hashlib
+import io
+import json
+import logging
 import os
+import tempfile
+import threading
 from django.conf import settings
-from django.core.files import File
-from app.models import (
-    Division, EssentialFunction, CriticalApplication, KeyPersonnel,
-    VitalRecord, Dependency, AlternateFacility, Communication,
-    RecoveryPriority, DivisionMetadata, GeneratedPlan
+from app.dashboard import invalidate_leadership_dashboard
+from app.models import Division, GeneratedPlan
+from app.services import plan_storage
+from app.services.docx_tables import add_table_bulk
+from app.services.pdf_converter import PdfConversionError, get_converter_pool
+from app.services.plan_snapshot import PLAN_SECTIONS, load_plan_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+# Caps how many PDF conversions run at once in this process, independent of
+# how many plan generation jobs the queue is executing.
+_pdf_conversion_slots = threading.BoundedSemaphore(
+    getattr(settings, 'COOP_PDF_CONVERSION_CONCURRENCY', 2)
 )
 
 
-def generate_coop_plan_for_division(division_id):
+def set_pdf_conversion_slots(semaphore):
+    """Share a conversion cap with other processes (see services.bulk_plans)."""
+    global _pdf_conversion_slots
+    _pdf_conversion_slots = semaphore
+
+
+# Parsed organization template per path: (mtime, pristine Document, sha256).
+_template_cache = {}
+_template_lock = threading.Lock()
+
+
+def get_plan_template():
+    """
+    Returns (pristine Document, digest) for COOP_PLAN_TEMPLATE_PATH, parsing
+    the .docx at most once per process (again only if the file changes).
+    Without a configured template the python-docx default is cached instead.
+    """
+    path = getattr(settings, 'COOP_PLAN_TEMPLATE_PATH', '') or None
+    mtime = os.path.getmtime(path) if path else None
+    with _template_lock:
+        cached = _template_cache.get(path)
+        if cached is None or cached[0] != mtime:
+            if path:
+                with open(path, 'rb') as fh:
+                    digest = hashlib.sha256(fh.read()).hexdigest()
+            else:
+                digest = ''
+            cached = (mtime, Document(path), digest)
+            _template_cache[path] = cached
+    return cached[1], cached[2]
+
+
+def new_plan_document():
+    """A fresh plan Document cloned from the cached template."""
+    # Deep-copying the parsed XML parts is much cheaper than re-reading and
+    # re-parsing the zip, especially for branded templates.
+    template, _digest = get_plan_template()
+    return copy.deepcopy(template)
+
+
+# Bump when the document layout changes so existing fingerprints stop matching.
+PLAN_FORMAT_VERSION = 1
+
+
+def compute_plan_fingerprint(snapshot):
+    """
+    Deterministic SHA-256 over every value that feeds the plan document.
+
+    plan_version and last_updated are left out: generation itself bumps
+    them, so including them would make every fingerprint unique.
+    """
+    division = snapshot.division._asdict()
+    del division['plan_version'], division['last_updated']
+    payload = {
+        'format': PLAN_FORMAT_VERSION,
+        'template': get_plan_template()[1],
+        'division': division,
+        'metadata': snapshot.metadata._asdict() if snapshot.metadata else None,
+    }
+    for name in PLAN_SECTIONS:
+        payload[name] = [list(row) for row in getattr(snapshot, name)]
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _reusable_plan(division_id, fingerprint):
+    """Latest plan for the division if it was built from identical data."""
+    latest = GeneratedPlan.objects.filter(division_id=division_id).first()
+    if latest is None or latest.fingerprint != fingerprint:
+        return None
+    if not (latest.docx_file and os.path.exists(latest.docx_file.path)):
+        return None
+    if not (latest.pdf_file and os.path.exists(latest.pdf_file.path)):
+        return None
+    return latest
+
+
+def generate_coop_plan_for_division(division_id, generated_by=None, force=False):
     """
     Main function to generate a complete COOP plan document.
     
+    If nothing feeding the document changed since the latest plan, that
+    plan is returned as-is (reused=True) unless force=True.
+    
     Returns:
         dict: {
             'success': bool,
             'plan': GeneratedPlan instance,
             'docx_path': str,
             'pdf_path': str,
+            'reused': bool,
             'errors': list
         }
     """
-    try:
-        division = Division.objects.get(pk=division_id)
-    except Division.DoesNotExist:
+    snapshot = load_plan_snapshot(division_id)
+    if snapshot is None:
         return {
             'success': False,
             'errors': [f'Division with ID {division_id} not found']
         }
+    division = snapshot.division
+    
+    fingerprint = compute_plan_fingerprint(snapshot)
+    if not force:
+        existing = _reusable_plan(division.id, fingerprint)
+        if existing is not None:
+            return {
+                'success': True,
+                'plan': existing,
+                'docx_path': existing.docx_file.path,
+                'pdf_path': existing.pdf_file.path,
+                'reused': True,
+                'errors': []
+            }
     
     # Create Word document
-    doc = Document()
+    doc = new_plan_document()
     
     # Add cover page
     _add_cover_page(doc, division)
@@ -50,77 +160,94 @@ def generate_coop_plan_for_division(division_id):
     
     # Add division metadata
     doc.add_page_break()
-    _add_division_metadata_section(doc, division)
+    _add_division_metadata_section(doc, snapshot)
     
     # Add essential functions
     doc.add_page_break()
-    _add_essential_functions_section(doc, division)
+    _add_essential_functions_section(doc, snapshot)
     
     # Add critical applications
     doc.add_page_break()
-    _add_critical_applications_section(doc, division)
+    _add_critical_applications_section(doc, snapshot)
     
     # Add key personnel
     doc.add_page_break()
-    _add_key_personnel_section(doc, division)
+    _add_key_personnel_section(doc, snapshot)
     
     # Add vital records
     doc.add_page_break()
-    _add_vital_records_section(doc, division)
+    _add_vital_records_section(doc, snapshot)
     
     # Add dependencies
     doc.add_page_break()
-    _add_dependencies_section(doc, division)
+    _add_dependencies_section(doc, snapshot)
     
     # Add alternate facilities
     doc.add_page_break()
-    _add_alternate_facilities_section(doc, division)
+    _add_alternate_facilities_section(doc, snapshot)
     
     # Add communications
     doc.add_page_break()
-    _add_communications_section(doc, division)
+    _add_communications_section(doc, snapshot)
     
     # Add recovery priorities
     doc.add_page_break()
-    _add_recovery_priorities_section(doc, division)
-    
-    # Save Word document
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename_base = f"COOP_Plan_{division.name.replace(' ', '_')}_{timestamp}"
-    
-    docx_filename = f"{filename_base}.docx"
-    docx_path = os.path.join(settings.MEDIA_ROOT, 'coop_plans', 'docx', docx_filename)
-    
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(docx_path), exist_ok=True)
-    
-    doc.save(docx_path)
-    
-    # Convert to PDF (requires LibreOffice or docx2pdf)
-    pdf_path = _convert_to_pdf(docx_path)
-    
-    # Create GeneratedPlan record
-    new_version = division.plan_version + 1
-    
-    with open(docx_path, 'rb') as docx_file:
-        with open(pdf_path, 'rb') as pdf_file:
-            plan = GeneratedPlan.objects.create(
-                division=division,
-                version=new_version,
-                docx_file=File(docx_file, name=os.path.basename(docx_path)),
-                pdf_file=File(pdf_file, name=os.path.basename(pdf_path)),
-                notes=f"Auto-generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            )
-    
-    # Update division version
-    division.plan_version = new_version
-    division.save()
+    _add_recovery_priorities_section(doc, snapshot)
+    
+    # Save Word document into the content-addressed store
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    docx_bytes = buffer.getvalue()
+    docx_name = plan_storage.store_bytes(docx_bytes, 'docx')
+    # Each store took a reference that the saved plan takes over; give them
+    # back if generation fails before then.
+    stored = [docx_name]
+    try:
+        # Convert to PDF (requires LibreOffice or docx2pdf) in a scratch
+        # directory on the same filesystem, then move the result into the store
+        filename_base = f"COOP_Plan_{division.name.replace(' ', '_').replace('/', '-')}"
+        with tempfile.TemporaryDirectory(dir=plan_storage.work_dir()) as work_dir:
+            work_docx_path = os.path.join(work_dir, f"{filename_base}.docx")
+            with open(work_docx_path, 'wb') as fh:
+                fh.write(docx_bytes)
+            with _pdf_conversion_slots:
+                work_pdf_path = _convert_to_pdf(work_docx_path)
+            pdf_name = plan_storage.store_file(work_pdf_path, 'pdf')
+            stored.append(pdf_name)
+    
+        # Create GeneratedPlan record pointing at the stored blobs (no copy)
+        new_version = division.plan_version + 1
+    
+        plan = GeneratedPlan(
+            division_id=division.id,
+            version=new_version,
+            plan_status=division.plan_status,
+            created_by=generated_by,
+            fingerprint=fingerprint,
+            notes=f"Auto-generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        )
+        plan.docx_file.name = docx_name
+        plan.pdf_file.name = pdf_name
+        plan.save()
+    except BaseException:
+        for name in stored:
+            plan_storage.release_artifact(name)
+        raise
+    
+    # Update division version (last_updated is auto_now, so set it explicitly)
+    Division.objects.filter(pk=division.id).update(
+        plan_version=new_version,
+        last_updated=date.today(),
+    )
+    # update() sends no post_save, and the dashboard shows the plan version.
+    invalidate_leadership_dashboard()
     
     return {
         'success': True,
         'plan': plan,
-        'docx_path': docx_path,
-        'pdf_path': pdf_path,
+        'docx_path': plan.docx_file.path,
+        'pdf_path': plan.pdf_file.path,
+        'reused': False,
         'errors': []
     }
 
@@ -146,39 +273,38 @@ def _add_cover_page(doc, division):
     metadata_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
 
 
-def _add_division_metadata_section(doc, division):
+def _add_division_metadata_section(doc, snapshot):
     """Add division profile/metadata section"""
     doc.add_heading('Division Profile', 1)
     
-    try:
-        metadata = division.divisionmetadata
-        
-        doc.add_heading('Director', 2)
-        doc.add_paragraph(metadata.director or 'Not specified')
-        
-        doc.add_heading('Mission Statement', 2)
-        doc.add_paragraph(metadata.mission_statement or 'Not specified')
-        
-        doc.add_heading('Primary Location', 2)
-        doc.add_paragraph(metadata.primary_location or 'Not specified')
-        
-        doc.add_heading('Staff Count', 2)
-        doc.add_paragraph(str(metadata.staff_count))
-        
-        doc.add_heading('Hours of Operation', 2)
-        doc.add_paragraph(metadata.hours_of_operation or 'Not specified')
-        
-    except DivisionMetadata.DoesNotExist:
+    metadata = snapshot.metadata
+    if metadata is None:
         doc.add_paragraph('Division metadata not yet configured.')
+        return
+    
+    doc.add_heading('Director', 2)
+    doc.add_paragraph(metadata.director or 'Not specified')
+    
+    doc.add_heading('Mission Statement', 2)
+    doc.add_paragraph(metadata.mission_statement or 'Not specified')
+    
+    doc.add_heading('Primary Location', 2)
+    doc.add_paragraph(metadata.primary_location or 'Not specified')
+    
+    doc.add_heading('Staff Count', 2)
+    doc.add_paragraph(str(metadata.staff_count))
+    
+    doc.add_heading('Hours of Operation', 2)
+    doc.add_paragraph(metadata.hours_of_operation or 'Not specified')
 
 
-def _add_essential_functions_section(doc, division):
+def _add_essential_functions_section(doc, snapshot):
     """Add essential functions section"""
     doc.add_heading('Essential Functions', 1)
     
-    functions = EssentialFunction.objects.filter(division=division).order_by('priority', 'name')
+    functions = snapshot.essential_functions
     
-    if not functions.exists():
+    if not functions:
         doc.add_paragraph('No essential functions defined.')
         return
     
@@ -201,77 +327,58 @@ def _add_essential_functions_section(doc, division):
         doc.add_paragraph()  # Spacing
 
 
-def _add_critical_applications_section(doc, division):
+def _add_critical_applications_section(doc, snapshot):
     """Add critical applications section"""
     doc.add_heading('Critical Applications', 1)
     
-    apps = CriticalApplication.objects.filter(division=division).order_by('recovery_tier', 'name')
+    apps = snapshot.critical_applications
     
-    if not apps.exists():
+    if not apps:
         doc.add_paragraph('No critical applications defined.')
         return
     
-    # Create table
-    table = doc.add_table(rows=1, cols=5)
-    table.style = 'Light Grid Accent 1'
-    
-    # Header row
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = 'Application'
-    hdr_cells[1].text = 'Hosting'
-    hdr_cells[2].text = 'Recovery Tier'
-    hdr_cells[3].text = 'RTO'
-    hdr_cells[4].text = 'Vendor Contact'
-    
-    # Data rows
-    for app in apps:
-        row_cells = table.add_row().cells
-        row_cells[0].text = app.name
-        row_cells[1].text = app.hosting_environment
-        row_cells[2].text = app.recovery_tier
-        row_cells[3].text = app.rto
-        row_cells[4].text = app.vendor_contact or 'N/A'
-
-
-def _add_key_personnel_section(doc, division):
+    add_table_bulk(
+        doc,
+        ['Application', 'Hosting', 'Recovery Tier', 'RTO', 'Vendor Contact'],
+        (
+            [app.name, app.hosting_environment, app.recovery_tier, app.rto,
+             app.vendor_contact or 'N/A']
+            for app in apps
+        ),
+        style='Light Grid Accent 1',
+    )
+
+
+def _add_key_personnel_section(doc, snapshot):
     """Add key personnel section"""
     doc.add_heading('Key Personnel', 1)
     
-    personnel = KeyPersonnel.objects.filter(division=division).order_by('primary_or_alternate', 'role')
+    personnel = snapshot.key_personnel
     
-    if not personnel.exists():
+    if not personnel:
         doc.add_paragraph('No key personnel defined.')
         return
     
-    # Create table
-    table = doc.add_table(rows=1, cols=5)
-    table.style = 'Light Grid Accent 1'
-    
-    # Header row
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = 'Name'
-    hdr_cells[1].text = 'Role'
-    hdr_cells[2].text = 'Type'
-    hdr_cells[3].text = 'Phone'
-    hdr_cells[4].text = 'Email'
-    
-    # Data rows
-    for person in personnel:
-        row_cells = table.add_row().cells
-        row_cells[0].text = person.name
-        row_cells[1].text = person.role
-        row_cells[2].text = person.primary_or_alternate
-        row_cells[3].text = person.mobile_phone or person.work_phone or 'N/A'
-        row_cells[4].text = person.email or 'N/A'
-
-
-def _add_vital_records_section(doc, division):
+    add_table_bulk(
+        doc,
+        ['Name', 'Role', 'Type', 'Phone', 'Email'],
+        (
+            [person.name, person.role, person.primary_or_alternate,
+             person.mobile_phone or person.work_phone or 'N/A',
+             person.email or 'N/A']
+            for person in personnel
+        ),
+        style='Light Grid Accent 1',
+    )
+
+
+def _add_vital_records_section(doc, snapshot):
     """Add vital records section"""
     doc.add_heading('Vital Records', 1)
     
-    records = VitalRecord.objects.filter(division=division).order_by('priority', 'name')
+    records = snapshot.vital_records
     
-    if not records.exists():
+    if not records:
         doc.add_paragraph('No vital records defined.')
         return
     
@@ -285,13 +392,13 @@ def _add_vital_records_section(doc, division):
         doc.add_paragraph()
 
 
-def _add_dependencies_section(doc, division):
+def _add_dependencies_section(doc, snapshot):
     """Add dependencies section"""
     doc.add_heading('Dependencies', 1)
     
-    deps = Dependency.objects.filter(division=division).order_by('criticality', 'name')
+    deps = snapshot.dependencies
     
-    if not deps.exists():
+    if not deps:
         doc.add_paragraph('No dependencies defined.')
         return
     
@@ -304,13 +411,13 @@ def _add_dependencies_section(doc, division):
         doc.add_paragraph()
 
 
-def _add_alternate_facilities_section(doc, division):
+def _add_alternate_facilities_section(doc, snapshot):
     """Add alternate facilities section"""
     doc.add_heading('Alternate Facilities', 1)
     
-    facilities = AlternateFacility.objects.filter(division=division)
+    facilities = snapshot.alternate_facilities
     
-    if not facilities.exists():
+    if not facilities:
         doc.add_paragraph('No alternate facilities defined.')
         return
     
@@ -324,13 +431,13 @@ def _add_alternate_facilities_section(doc, division):
         doc.add_paragraph()
 
 
-def _add_communications_section(doc, division):
+def _add_communications_section(doc, snapshot):
     """Add communications section"""
     doc.add_heading('Communications', 1)
     
-    comms = Communication.objects.filter(division=division)
+    comms = snapshot.communications
     
-    if not comms.exists():
+    if not comms:
         doc.add_paragraph('No communications defined.')
         return
     
@@ -343,34 +450,26 @@ def _add_communications_section(doc, division):
         doc.add_paragraph()
 
 
-def _add_recovery_priorities_section(doc, division):
+def _add_recovery_priorities_section(doc, snapshot):
     """Add recovery priorities section"""
     doc.add_heading('Recovery Priorities', 1)
     
-    priorities = RecoveryPriority.objects.filter(division=division).order_by('priority_level')
+    priorities = snapshot.recovery_priorities
     
-    if not priorities.exists():
+    if not priorities:
         doc.add_paragraph('No recovery priorities defined.')
         return
     
-    # Create table
-    table = doc.add_table(rows=1, cols=4)
-    table.style = 'Light Grid Accent 1'
-    
-    # Header row
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = 'Priority Level'
-    hdr_cells[1].text = 'Item'
-    hdr_cells[2].text = 'Type'
-    hdr_cells[3].text = 'Rationale'
-    
-    # Data rows
-    for priority in priorities:
-        row_cells = table.add_row().cells
-        row_cells[0].text = str(priority.priority_level)
-        row_cells[1].text = priority.item_name
-        row_cells[2].text = priority.item_type
-        row_cells[3].text = priority.rationale or 'N/A'
+    add_table_bulk(
+        doc,
+        ['Priority Level', 'Item', 'Type', 'Rationale'],
+        (
+            [str(priority.priority_level), priority.item_name, priority.item_type,
+             priority.rationale or 'N/A']
+            for priority in priorities
+        ),
+        style='Light Grid Accent 1',
+    )
 
 
 def _convert_to_pdf(docx_path):
@@ -378,8 +477,10 @@ def _convert_to_pdf(docx_path):
     Convert Word document to PDF.
     
     Options:
-    1. Use docx2pdf library (Windows/Mac with Word installed)
-    2. Use LibreOffice in headless mode (Linux/cross-platform)
+    1. Use the persistent converter pool (when COOP_PDF_POOL_SIZE > 0),
+       falling through to the options below if it fails
+    2. Use docx2pdf library (Windows/Mac with Word installed)
+    3. Use LibreOffice in headless mode (Linux/cross-platform)
     
     Returns path to PDF file.
     """
@@ -388,6 +489,13 @@ def _convert_to_pdf(docx_path):
     # Ensure PDF directory exists
     os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
     
+    pool = get_converter_pool()
+    if pool is not None:
+        try:
+            return pool.convert(docx_path, pdf_path)
+        except PdfConversionError as exc:
+            logger.warning("PDF converter pool failed, converting in-process: %s", exc)
+    
     try:
         # Try using docx2pdf first
         from docx2pdf import convert
@@ -0,0 +1,116 @@
+# app/services/plan_retention.py
+"""
+Retention policy for GeneratedPlan history.
+
+For each division a plan is kept if it matches any rule:
+  * it is one of the `keep_last` most recent plans
+  * it was generated while the division plan was Approved (`keep_approved`)
+  * it is the newest plan of its calendar month (`keep_monthly`)
+Everything else is expired. Blob sizes are only counted as reclaimable once
+no surviving plan references them (artifacts are shared, see plan_storage).
+"""
+import os
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import transaction
+from app.models import GeneratedPlan
+from app.services.plan_storage import release_artifact
+
+
+@dataclass
+class RetentionPolicy:
+    keep_last: int = 10
+    keep_approved: bool = True
+    keep_monthly: bool = True
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            keep_last=getattr(settings, 'COOP_PLAN_RETENTION_KEEP_LAST', 10),
+            keep_approved=getattr(settings, 'COOP_PLAN_RETENTION_KEEP_APPROVED', True),
+            keep_monthly=getattr(settings, 'COOP_PLAN_RETENTION_KEEP_MONTHLY', True),
+        )
+
+
+@dataclass
+class RetentionReport:
+    expired_ids: list = field(default_factory=list)
+    kept: int = 0
+    freed_names: set = field(default_factory=set)
+    reclaimed_bytes: int = 0
+
+
+def _expired_plan_ids(plans, policy):
+    expired = []
+    current_division = None
+    for plan in plans:
+        if plan['division_id'] != current_division:
+            current_division = plan['division_id']
+            seen = 0
+            months = set()
+        seen += 1
+        month = (plan['created_at'].year, plan['created_at'].month)
+        keep = (
+            seen <= policy.keep_last
+            or (policy.keep_approved and plan['plan_status'] == 'Approved')
+            or (policy.keep_monthly and month not in months)
+        )
+        months.add(month)
+        if not keep:
+            expired.append(plan['id'])
+    return expired
+
+
+def plan_retention(policy, division_ids=None, pdf_only=False):
+    """
+    Work out which plans the policy expires and how many bytes removing
+    their artifacts would reclaim. Nothing is changed on disk or in the DB.
+    """
+    plans = GeneratedPlan.objects.order_by('division_id', '-created_at')
+    if division_ids:
+        plans = plans.filter(division_id__in=division_ids)
+    plans = list(plans.values('id', 'division_id', 'created_at', 'plan_status', 'docx_file', 'pdf_file'))
+
+    report = RetentionReport(expired_ids=_expired_plan_ids(plans, policy))
+    report.kept = len(plans) - len(report.expired_ids)
+    expired = set(report.expired_ids)
+
+    columns = ('pdf_file',) if pdf_only else ('docx_file', 'pdf_file')
+    candidates = {
+        plan[column] for plan in plans if plan['id'] in expired for column in columns
+    } - {''}
+
+    # Blobs are shared across plans (and divisions); look at every survivor.
+    survivors = GeneratedPlan.objects.exclude(pk__in=expired)
+    still_used = set()
+    for docx_name, pdf_name in survivors.values_list('docx_file', 'pdf_file'):
+        still_used.update((docx_name, pdf_name))
+    if pdf_only:
+        still_used.update(
+            GeneratedPlan.objects.filter(pk__in=expired).values_list('docx_file', flat=True)
+        )
+
+    report.freed_names = candidates - still_used
+    for name in report.freed_names:
+        try:
+            report.reclaimed_bytes += os.path.getsize(os.path.join(settings.MEDIA_ROOT, name))
+        except OSError:
+            pass
+    return report
+
+
+def apply_retention(report, pdf_only=False):
+    """Delete (or strip the PDFs of) the plans selected by plan_retention()."""
+    with transaction.atomic():
+        plans = GeneratedPlan.objects.filter(pk__in=report.expired_ids)
+        if pdf_only:
+            # One reference per stripped plan, even where plans share a PDF.
+            dropped = [name for name in plans.values_list('pdf_file', flat=True) if name]
+            plans.update(pdf_file='')
+        else:
+            # post_delete releases the blobs after commit.
+            plans.delete()
+    if pdf_only:
+        for name in dropped:
+            release_artifact(name)
@@ -0,0 +1,135 @@
+# app/services/plan_snapshot.py
+"""
+Loads everything the COOP plan document needs in a fixed number of queries.
+
+The document builders in app.services.coop_plan used to query each child
+table twice (.exists() plus iteration). Instead, load_plan_snapshot() reads
+the division (with its metadata via select_related) and then each child table
+once with values_list() on just the columns the document renders, so a plan
+costs 1 + len(PLAN_SECTIONS) queries no matter how many rows a division has.
+
+The result is an immutable PlanSnapshot of namedtuples: builders cannot
+trigger lazy loads, and the snapshot doubles as the input to the plan
+fingerprint.
+"""
+from collections import namedtuple
+from dataclasses import dataclass
+
+from app.models import (
+    Division, EssentialFunction, CriticalApplication, KeyPersonnel,
+    VitalRecord, Dependency, AlternateFacility, Communication,
+    RecoveryPriority, DivisionMetadata
+)
+
+
+DIVISION_FIELDS = (
+    'id', 'name', 'coordinator_id', 'plan_status', 'last_updated',
+    'next_review_date', 'plan_version', 'notes',
+)
+METADATA_FIELDS = (
+    'director', 'mission_statement', 'primary_location',
+    'staff_count', 'hours_of_operation',
+)
+
+# attribute name -> (model, columns rendered, ordering)
+PLAN_SECTIONS = {
+    'essential_functions': (
+        EssentialFunction,
+        ('name', 'priority', 'owner', 'mtd', 'rto', 'description',
+         'dependencies', 'alternate_procedures'),
+        ('priority', 'name'),
+    ),
+    'critical_applications': (
+        CriticalApplication,
+        ('name', 'hosting_environment', 'recovery_tier', 'rto', 'vendor_contact'),
+        ('recovery_tier', 'name'),
+    ),
+    'key_personnel': (
+        KeyPersonnel,
+        ('name', 'role', 'primary_or_alternate', 'work_phone', 'mobile_phone', 'email'),
+        ('primary_or_alternate', 'role'),
+    ),
+    'vital_records': (
+        VitalRecord,
+        ('name', 'record_type', 'priority', 'format', 'storage_location', 'backup_location'),
+        ('priority', 'name'),
+    ),
+    'dependencies': (
+        Dependency,
+        ('name', 'dependency_type', 'criticality', 'description', 'vendor_contact'),
+        ('criticality', 'name'),
+    ),
+    'alternate_facilities': (
+        AlternateFacility,
+        ('name', 'facility_type', 'address', 'capacity', 'it_availability', 'contact'),
+        ('pk',),
+    ),
+    'communications': (
+        Communication,
+        ('communication_type', 'method', 'primary_contact', 'backup_contact', 'contact_details'),
+        ('pk',),
+    ),
+    'recovery_priorities': (
+        RecoveryPriority,
+        ('priority_level', 'item_name', 'item_type', 'rationale'),
+        ('priority_level',),
+    ),
+}
+
+DivisionRow = namedtuple('DivisionRow', DIVISION_FIELDS)
+MetadataRow = namedtuple('MetadataRow', METADATA_FIELDS)
+_ROW_TYPES = {
+    name: namedtuple(model.__name__ + 'Row', fields)
+    for name, (model, fields, _ordering) in PLAN_SECTIONS.items()
+}
+
+
+@dataclass(frozen=True)
+class PlanSnapshot:
+    division: DivisionRow
+    metadata: MetadataRow | None
+    essential_functions: tuple
+    critical_applications: tuple
+    key_personnel: tuple
+    vital_records: tuple
+    dependencies: tuple
+    alternate_facilities: tuple
+    communications: tuple
+    recovery_priorities: tuple
+
+
+def load_plan_snapshot(division_id):
+    """Returns a PlanSnapshot for the division, or None if it does not exist."""
+    only = DIVISION_FIELDS + tuple(f'divisionmetadata__{f}' for f in METADATA_FIELDS)
+    try:
+        division = (
+            Division.objects
+            .select_related('divisionmetadata')
+            .only(*(f for f in only if f != 'coordinator_id'), 'coordinator')
+            .get(pk=division_id)
+        )
+    except Division.DoesNotExist:
+        return None
+
+    try:
+        meta = division.divisionmetadata
+        metadata = MetadataRow(*(getattr(meta, f) for f in METADATA_FIELDS))
+    except DivisionMetadata.DoesNotExist:
+        metadata = None
+
+    sections = {}
+    for name, (model, fields, ordering) in PLAN_SECTIONS.items():
+        row_type = _ROW_TYPES[name]
+        rows = (
+            model.objects
+            .filter(division_id=division_id)
+            .order_by(*ordering)
+            .values_list(*fields)
+        )
+        sections[name] = tuple(row_type._make(row) for row in rows)
+
+    return PlanSnapshot(
+        division=DivisionRow(*(getattr(division, f) for f in DIVISION_FIELDS)),
+        metadata=metadata,
+        **sections,
+    )
@@ -0,0 +1,148 @@
+# app/services/plan_storage.py
+"""
+Content-addressed storage for generated plan artifacts.
+
+Each DOCX/PDF is stored once under MEDIA_ROOT/coop_plans/blobs/ named by the
+SHA-256 of its bytes, and GeneratedPlan.docx_file / pdf_file simply point at
+that name. Writing goes through a temp file in the same directory plus an
+atomic os.replace(), so readers never see a partial file and identical
+artifacts are written only once.
+
+Each blob has a PlanBlob row holding its reference count. store_bytes() and
+store_file() take a reference for the caller (who hands it to a GeneratedPlan,
+or gives it back with release_artifact() on failure), and release_artifact()
+drops one. Both lock the row with SELECT ... FOR UPDATE, so a store that finds
+the file present cannot interleave with a release that is about to unlink it.
+The file is unlinked only after the releasing transaction commits, under the
+lock again, and only if the count is still zero.
+
+Blobs written before PlanBlob existed get a row on first touch, seeded with
+the number of GeneratedPlan rows naming them.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+BLOB_DIR = os.path.join('coop_plans', 'blobs')
+WORK_DIR = os.path.join('coop_plans', 'work')
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _blob_name(digest, ext):
+    return os.path.join(BLOB_DIR, digest[:2], f'{digest}.{ext}')
+
+
+def _absolute(name):
+    return os.path.join(settings.MEDIA_ROOT, name)
+
+
+def work_dir():
+    """Scratch directory on the same filesystem as the blob store."""
+    path = _absolute(WORK_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _lock_blob(name):
+    """The locked PlanBlob row for `name` and whether it was just created."""
+    from app.models import PlanBlob
+    return PlanBlob.objects.select_for_update().get_or_create(
+        name=name, defaults={'ref_count': reference_count(name)},
+    )
+
+
+def _add_reference(blob):
+    blob.ref_count += 1
+    blob.save(update_fields=['ref_count'])
+
+
+def _publish(tmp_path, name, blob=None):
+    """
+    Atomically move tmp_path to `name` unless that blob already exists, and
+    take a reference to it for the caller.
+    """
+    target = _absolute(name)
+    with transaction.atomic():
+        if blob is None:
+            blob, _created = _lock_blob(name)
+        if os.path.exists(target):
+            os.unlink(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(tmp_path, target)
+        _add_reference(blob)
+    return name
+
+
+def store_bytes(data, ext):
+    """
+    Store `data` and return its storage name (relative to MEDIA_ROOT). The
+    caller owns one reference to it.
+    """
+    name = _blob_name(hashlib.sha256(data).hexdigest(), ext)
+    with transaction.atomic():
+        blob, _created = _lock_blob(name)
+        if not os.path.exists(_absolute(name)):
+            fd, tmp_path = tempfile.mkstemp(dir=work_dir(), suffix=f'.{ext}')
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(data)
+            _publish(tmp_path, name, blob)
+        else:
+            _add_reference(blob)
+    return name
+
+
+def store_file(path, ext):
+    """
+    Move the file at `path` into the store and return its storage name; the
+    caller owns one reference to it. `path` should live under work_dir() so
+    the move is a rename, not a copy.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return _publish(path, _blob_name(digest.hexdigest(), ext))
+
+
+def reference_count(name):
+    """GeneratedPlan rows naming the blob (used to seed its PlanBlob row)."""
+    from app.models import GeneratedPlan
+    return GeneratedPlan.objects.filter(Q(docx_file=name) | Q(pdf_file=name)).count()
+
+
+def release_artifact(name):
+    """
+    Drop one reference to a stored blob. Once none remain, the file is
+    deleted after the current transaction commits.
+    """
+    # Anything under coop_plans/ is ours, including pre-blob-store artifacts.
+    if not name or not name.startswith('coop_plans'):
+        return
+    with transaction.atomic():
+        blob, created = _lock_blob(name)
+        # A freshly seeded row already excludes the reference being dropped.
+        if not created and blob.ref_count:
+            blob.ref_count -= 1
+            blob.save(update_fields=['ref_count'])
+        if blob.ref_count == 0:
+            transaction.on_commit(lambda: _delete_if_unreferenced(name))
+
+
+def _delete_if_unreferenced(name):
+    """Unlink the blob if, under its row lock, it still has no references."""
+    from app.models import PlanBlob
+    with transaction.atomic():
+        blob = PlanBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None or blob.ref_count:
+            return False
+        try:
+            os.unlink(_absolute(name))
+        except FileNotFoundError:
+            pass
+        blob.delete()
+    return True
@@ -0,0 +1,71 @@
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .dashboard import invalidate_leadership_dashboard
+from .listing import invalidate_filter_options
+from .models import (
+    Division, EssentialFunction, CriticalApplication, KeyPersonnel,
+    VitalRecord, Dependency, AlternateFacility, Communication,
+    RecoveryPriority, GeneratedPlan
+)
+from .permissions import invalidate_user_roles
+from .services.plan_storage import release_artifact
+
+
+@receiver(post_delete, sender=GeneratedPlan)
+def release_plan_artifacts(sender, instance, **kwargs):
+    """Drop stored blobs once the last plan referencing them is gone."""
+    names = [instance.docx_file.name, instance.pdf_file.name]
+
+    def release():
+        for name in names:
+            release_artifact(name)
+
+    # Wait for the delete to commit so the reference count is accurate.
+    transaction.on_commit(release)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_roles_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop cached group names when a user joins or leaves a group."""
+    if action not in ("post_add", "post_remove", "post_clear", "pre_clear"):
+        return
+    if not reverse:
+        invalidate_user_roles(instance.pk)
+    elif pk_set:
+        invalidate_user_roles(*pk_set)
+    else:
+        # group.user_set.clear(): the members are only known before the clear.
+        invalidate_user_roles(*instance.user_set.values_list("pk", flat=True))
+
+
+@receiver([post_save, pre_delete], sender=Group)
+def invalidate_roles_on_group_change(sender, instance, **kwargs):
+    """A renamed or deleted group changes its members' roles."""
+    if instance.pk:
+        invalidate_user_roles(*instance.user_set.values_list("pk", flat=True))
+
+
+@receiver([post_save, post_delete], sender=Division)
+@receiver([post_save, post_delete], sender=EssentialFunction)
+@receiver([post_save, post_delete], sender=CriticalApplication)
+@receiver([post_save, post_delete], sender=KeyPersonnel)
+@receiver([post_save, post_delete], sender=VitalRecord)
+def invalidate_dashboard_on_change(sender, **kwargs):
+    """Division and child counts feed the cached leadership dashboard."""
+    invalidate_leadership_dashboard()
+
+
+@receiver([post_save, post_delete], sender=EssentialFunction)
+@receiver([post_save, post_delete], sender=CriticalApplication)
+@receiver([post_save, post_delete], sender=KeyPersonnel)
+@receiver([post_save, post_delete], sender=VitalRecord)
+@receiver([post_save, post_delete], sender=Dependency)
+@receiver([post_save, post_delete], sender=AlternateFacility)
+@receiver([post_save, post_delete], sender=Communication)
+@receiver([post_save, post_delete], sender=RecoveryPriority)
+def invalidate_filters_on_change(sender, instance, **kwargs):
+    """Saves and deletes can add or remove a division's filter options."""
+    invalidate_filter_options(sender, instance.division_id)
@@ -0,0 +1,112 @@
+"""
+Durable ServiceNow division syncs.
+
+A division sync runs as a DBOS workflow in which every page (fetch plus bulk
+upsert) is its own checkpointed step. If the process dies or is redeployed
+mid-table, DBOS recovers the workflow and replays finished pages from their
+checkpoints, so only the page that was in flight is fetched again. Pages
+record the sys_ids they saw in the database (ServiceNowSyncRecord) rather
+than in their checkpoints, which hold only counts and a watermark. Syncs are
+enqueued on a queue whose global concurrency bounds how many divisions sync
+at once.
+"""
+import uuid
+
+from dbos import DBOS, Queue, SetWorkflowID
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+SYNC_JOB_PREFIX = "snow-sync"
+SYNC_PROGRESS_EVENT = "sync_progress"
+
+servicenow_sync_queue = Queue(
+    "servicenow_sync",
+    concurrency=getattr(settings, "SNOW_SYNC_QUEUE_CONCURRENCY", 4),
+)
+
+
+def enqueue_servicenow_sync(config_id: int, full: bool = False) -> str:
+    """Queue a durable sync for one ServiceNowIntegrationConfig and return its job id."""
+    from app.plan_workflows import launch_dbos
+
+    launch_dbos()
+    job_id = f"{SYNC_JOB_PREFIX}-{config_id}-{uuid.uuid4().hex}"
+    with SetWorkflowID(job_id):
+        servicenow_sync_queue.enqueue(sync_division_workflow, config_id, full)
+    return job_id
+
+
+def _config(config_id: int):
+    from app.models import ServiceNowIntegrationConfig
+    return ServiceNowIntegrationConfig.objects.select_related("division").get(pk=config_id)
+
+
+@DBOS.workflow()
+def sync_division_workflow(config_id: int, full: bool = False) -> dict:
+    plan = begin_sync_step(config_id, full)
+    summary = {"mode": "full" if plan["full"] else "incremental",
+               "created": 0, "updated": 0, "unchanged": 0, "deleted": 0, "total": 0}
+    watermark = ["", ""]
+    total = None
+    run_id = DBOS.workflow_id
+
+    # A short page isn't necessarily the last one (ACL-filtered rows, an
+    # instance row cap), so the scan runs to the first page's X-Total-Count,
+    # or to an empty page when ServiceNow reports none.
+    offset = 0
+    while True:
+        page = sync_page_step(config_id, plan["query"], offset, plan["page_size"], run_id)
+        for key in ("created", "updated", "unchanged"):
+            summary[key] += page[key]
+        summary["total"] += page["fetched"]
+        watermark = max(watermark, page["watermark"])
+        if offset == 0:
+            total = page["total"]
+        DBOS.set_event(SYNC_PROGRESS_EVENT, {"records": summary["total"]})
+        offset += plan["page_size"]
+        if (offset >= total) if total is not None else not page["fetched"]:
+            break
+
+    # Deleting what wasn't seen is only safe once every record was.
+    finished = finish_sync_step(config_id, run_id, plan["full"], watermark, total)
+    summary["deleted"] = finished["deleted"]
+    summary["complete"] = finished["complete"]
+    DBOS.set_event(SYNC_PROGRESS_EVENT, {"records": summary["total"], "done": True})
+    return summary
+
+
+@DBOS.step()
+def begin_sync_step(config_id: int, full: bool) -> dict:
+    from app.integrations.servicenow import begin_paged_sync
+
+    try:
+        return begin_paged_sync(_config(config_id), full=full)
+    finally:
+        close_old_connections()
+
+
+@DBOS.step(retries_allowed=True, max_attempts=3)
+def sync_page_step(config_id: int, query: str | None, offset: int, page_size: int,
+                   run_id: str) -> dict:
+    from app.integrations.servicenow import sync_page
+
+    try:
+        return sync_page(_config(config_id), query, offset, page_size, run_id)
+    finally:
+        close_old_connections()
+
+
+@DBOS.step()
+def finish_sync_step(config_id: int, run_id: str, full: bool, watermark: list,
+                     total: int | None) -> dict:
+    from app.integrations.servicenow import finish_paged_sync
+
+    try:
+        config = _config(config_id)
+        finished = finish_paged_sync(config, run_id, full, watermark, total)
+        config.last_sync = timezone.now()
+        config.save(update_fields=["last_sync"])
+        return finished
+    finally:
+        close_old_connections()
@@ -0,0 +1,324 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, modify_settings, override_settings
+from django.urls import reverse
+
+from app.models import (
+    Division, EssentialFunction, CriticalApplication, KeyPersonnel,
+    VitalRecord, Dependency, AlternateFacility, Communication,
+    RecoveryPriority, DivisionMetadata, ServiceNowIntegrationConfig, ServiceNowSyncRecord
+)
+from app import views
+from app.dashboard import get_leadership_dashboard
+from app.integrations.servicenow import (
+    begin_paged_sync, finish_paged_sync, sync_critical_applications_from_servicenow, sync_page
+)
+from app.integrations.servicenow_emulator import TableAPIEmulator, synthetic_cmdb_records
+from app.listing import filter_options
+from app.permissions import ADMIN_GROUP
+from app.query_budget import QueryBudgetExceeded
+from app.services import plan_storage
+from app.services.coop_plan import generate_coop_plan_for_division
+from app.services.plan_snapshot import PLAN_SECTIONS, load_plan_snapshot
+
+
+def populate_division(division, rows):
+    """Give `division` metadata and `rows` rows in every plan section."""
+    DivisionMetadata.objects.create(division=division, director="Director")
+    for i in range(rows):
+        EssentialFunction.objects.create(
+            division=division, name=f"Function {i}", mtd="24h", rto="4h", priority="High",
+        )
+        CriticalApplication.objects.create(
+            division=division, name=f"App {i}", hosting_environment="SaaS",
+            recovery_tier="Tier 1", rto="4h",
+        )
+        KeyPersonnel.objects.create(
+            division=division, name=f"Person {i}", role="Lead", primary_or_alternate="Primary",
+        )
+        VitalRecord.objects.create(
+            division=division, name=f"Record {i}", record_type="Paper",
+            storage_location="Vault", backup_location="Offsite", format="PDF", priority="High",
+        )
+        Dependency.objects.create(
+            division=division, name=f"Dependency {i}", dependency_type="Vendor", criticality="High",
+        )
+        AlternateFacility.objects.create(
+            division=division, name=f"Facility {i}", address="1 Main St",
+            facility_type="Warm", capacity=10, it_availability="Full",
+        )
+        Communication.objects.create(
+            division=division, communication_type=f"Call tree {i}", primary_contact="Ops",
+            contact_details="555-0100", method="Phone",
+        )
+        RecoveryPriority.objects.create(
+            division=division, item_name=f"Item {i}", item_type="Function", priority_level=i,
+        )
+
+
+class PlanSnapshotQueryTests(TestCase):
+    # The division (with metadata) plus one query per section.
+    EXPECTED_QUERIES = 1 + len(PLAN_SECTIONS)
+
+    def assert_snapshot_queries(self, rows):
+        division = Division.objects.create(name=f"Division with {rows} rows")
+        populate_division(division, rows)
+
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            snapshot = load_plan_snapshot(division.pk)
+
+        self.assertEqual(snapshot.metadata.director, "Director")
+        for name in PLAN_SECTIONS:
+            self.assertEqual(len(getattr(snapshot, name)), rows, name)
+
+    def test_one_row_per_section(self):
+        self.assertEqual(self.EXPECTED_QUERIES, 9)
+        self.assert_snapshot_queries(1)
+
+    def test_many_rows_per_section(self):
+        self.assert_snapshot_queries(50)
+
+    def test_missing_division(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(load_plan_snapshot(0))
+
+
+class PlanStorageTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def path(self, name):
+        return os.path.join(settings.MEDIA_ROOT, name)
+
+    def test_blob_deleted_after_last_reference(self):
+        first = plan_storage.store_bytes(b"plan", "docx")
+        second = plan_storage.store_bytes(b"plan", "docx")
+        self.assertEqual(first, second)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            plan_storage.release_artifact(first)
+        self.assertTrue(os.path.exists(self.path(first)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            plan_storage.release_artifact(first)
+        self.assertFalse(os.path.exists(self.path(first)))
+
+    def test_store_during_release_keeps_blob(self):
+        name = plan_storage.store_bytes(b"plan", "docx")
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                plan_storage.release_artifact(name)
+                # Same content stored again before the release commits.
+                plan_storage.store_bytes(b"plan", "docx")
+        self.assertTrue(os.path.exists(self.path(name)))
+
+
+@modify_settings(MIDDLEWARE={"prepend": "app.query_budget.QueryBudgetMiddleware"})
+@override_settings(COOP_QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    DIVISION_VIEWS = [
+        "division_detail", "essential_function_list", "critical_application_list",
+        "key_personnel_list", "vital_record_list", "dependency_list",
+        "alternate_facility_list", "communication_list", "recovery_priority_list",
+        "coop_plan_history",
+    ]
+
+    def setUp(self):
+        user = User.objects.create_user("admin")
+        user.groups.add(Group.objects.create(name=ADMIN_GROUP))
+        self.client.force_login(user)
+        self.division = Division.objects.create(name="Finance")
+        populate_division(self.division, 30)
+
+    def test_views_within_budget(self):
+        urls = [reverse("division_list"), reverse("leadership_dashboard")]
+        urls += [reverse(name, args=[self.division.pk]) for name in self.DIVISION_VIEWS]
+        for url in urls:
+            with self.subTest(url=url):
+                # Strict mode raises QueryBudgetExceeded from an over-budget view.
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_over_budget_raises(self):
+        with mock.patch.object(views.division_list, "query_budget", 1):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse("division_list"))
+
+
+class FilterOptionsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.division = Division.objects.create(name="Finance")
+        populate_division(self.division, 3)
+
+    def test_options_cached_until_a_row_changes(self):
+        # One DISTINCT query per filter column, then none.
+        with self.assertNumQueries(2):
+            options = filter_options(CriticalApplication, self.division)
+        self.assertEqual(options, {"recovery_tier": ["Tier 1"], "hosting_environment": ["SaaS"]})
+        with self.assertNumQueries(0):
+            filter_options(CriticalApplication, self.division)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CriticalApplication.objects.create(
+                division=self.division, name="Mainframe", hosting_environment="On-prem",
+                recovery_tier="Tier 2", rto="8h",
+            )
+        options = filter_options(CriticalApplication, self.division)
+        self.assertEqual(options["hosting_environment"], ["On-prem", "SaaS"])
+
+
+def _fake_pdf(docx_path):
+    pdf_path = docx_path.replace(".docx", ".pdf")
+    with open(pdf_path, "wb") as fh:
+        fh.write(b"%PDF-1.4")
+    return pdf_path
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.division = Division.objects.create(name="Finance")
+        populate_division(self.division, 2)
+
+    def plan_version(self):
+        row, = get_leadership_dashboard()["divisions"]
+        return row["plan_version"]
+
+    @mock.patch("app.services.coop_plan._convert_to_pdf", _fake_pdf)
+    def test_plan_generation_refreshes_dashboard(self):
+        before = self.plan_version()
+        for expected in (before + 1, before + 2):
+            with self.captureOnCommitCallbacks(execute=True):
+                result = generate_coop_plan_for_division(self.division.pk, force=True)
+            self.assertTrue(result["success"], result["errors"])
+            self.assertEqual(self.plan_version(), expected)
+
+
+@override_settings(SNOW_PAGE_SIZE=100, SNOW_SYNC_BATCH_SIZE=100)
+class ServiceNowSyncTests(TestCase):
+    RECORDS = 250
+
+    def setUp(self):
+        self.division = Division.objects.create(name="Finance")
+        # Previously synced from ServiceNow, and no longer there.
+        CriticalApplication.objects.create(
+            division=self.division, name="Retired", hosting_environment="SaaS",
+            recovery_tier="Tier 3", rto="72h", snow_sys_id="f" * 32,
+        )
+        # Entered by hand; syncs never delete it.
+        CriticalApplication.objects.create(
+            division=self.division, name="Manual", hosting_environment="On-Prem",
+            recovery_tier="Tier 2", rto="8h",
+        )
+
+    def start_emulator(self, **kwargs):
+        self.records = synthetic_cmdb_records(self.RECORDS)
+        emulator = TableAPIEmulator(self.records, retry_after=0, **kwargs).start()
+        self.addCleanup(emulator.stop)
+        self.config = ServiceNowIntegrationConfig.objects.create(
+            division=self.division, enabled=True, instance_url=emulator.url,
+            username="sync", password="secret",
+        )
+        return emulator
+
+    def sync(self):
+        return sync_critical_applications_from_servicenow(self.division, config=self.config)
+
+    def paged_sync(self, run_id, full=False):
+        """What sync_division_workflow does, one step at a time."""
+        plan = begin_paged_sync(self.config, full=full)
+        watermark, total, offset = ["", ""], None, 0
+        while True:
+            page = sync_page(self.config, plan["query"], offset, plan["page_size"], run_id)
+            watermark = max(watermark, page["watermark"])
+            if offset == 0:
+                total = page["total"]
+            offset += plan["page_size"]
+            if offset >= total:
+                break
+        return finish_paged_sync(self.config, run_id, plan["full"], watermark, total)
+
+    def synced_names(self):
+        rows = CriticalApplication.objects.filter(division=self.division)
+        return set(rows.values_list("name", flat=True))
+
+    def newest_update(self):
+        return max(rec["sys_updated_on"] for rec in self.records)
+
+    def test_full_sync_pages_to_total_and_deletes_missing(self):
+        emulator = self.start_emulator()
+        summary = self.sync()
+
+        self.assertEqual(summary["mode"], "full")
+        self.assertEqual(summary["created"], self.RECORDS)
+        self.assertEqual(summary["total"], self.RECORDS)
+        self.assertEqual(summary["deleted"], 1)
+        # 250 records in pages of 100.
+        self.assertEqual(emulator.stats["requests"], 3)
+        self.assertEqual(len(self.synced_names()), self.RECORDS + 1)
+        self.assertIn("Manual", self.synced_names())
+        self.assertNotIn("Retired", self.synced_names())
+        self.config.refresh_from_db()
+        self.assertEqual(self.config.watermark_updated_on, self.newest_update())
+        self.assertIsNotNone(self.config.last_full_sync)
+
+    def test_incremental_sync_reads_changes_since_watermark(self):
+        self.start_emulator()
+        self.sync()
+        changed = self.records[7]
+        changed["u_rto"] = "2h"
+        changed["sys_updated_on"] = "2030-01-01 00:00:00"
+
+        summary = self.sync()
+
+        self.assertEqual(summary["mode"], "incremental")
+        self.assertEqual((summary["total"], summary["updated"]), (1, 1))
+        self.assertEqual(CriticalApplication.objects.get(snow_sys_id=changed["sys_id"]).rto, "2h")
+        self.config.refresh_from_db()
+        self.assertEqual(self.config.watermark_updated_on, "2030-01-01 00:00:00")
+
+    def test_throttled_requests_are_retried(self):
+        emulator = self.start_emulator(rate_429=0.3, seed=1)
+        summary = self.sync()
+
+        self.assertGreater(emulator.stats["throttled"], 0)
+        self.assertEqual(summary["created"], self.RECORDS)
+
+    def test_complete_paged_sync_deletes_unseen(self):
+        self.start_emulator()
+        result = self.paged_sync("run-complete", full=True)
+
+        self.assertEqual(result, {"deleted": 1, "complete": True})
+        self.assertNotIn("Retired", self.synced_names())
+        self.config.refresh_from_db()
+        self.assertEqual(self.config.watermark_updated_on, self.newest_update())
+        self.assertFalse(ServiceNowSyncRecord.objects.exists())
+
+    def test_short_paged_scan_deletes_nothing(self):
+        # An instance row cap below the page size leaves every page short.
+        self.start_emulator(max_limit=80)
+        result = self.paged_sync("run-short", full=True)
+
+        self.assertEqual(result, {"deleted": 0, "complete": False})
+        self.assertIn("Retired", self.synced_names())
+        self.config.refresh_from_db()
+        self.assertEqual(self.config.watermark_updated_on, "")
+        self.assertIsNone(self.config.last_full_sync)
+        self.assertFalse(ServiceNowSyncRecord.objects.exists())
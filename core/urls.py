@@ -188,11 +188,26 @@ urlpatterns = [
         views.generate_coop_plan_view,
         name="generate_coop_plan"
     ),
+    path(
+        "divisions/<int:division_id>/plan/jobs/<str:job_id>/",
+        views.coop_plan_job_status,
+        name="coop_plan_job_status"
+    ),
+    path(
+        "divisions/<int:division_id>/plan/jobs/<str:job_id>/status/",
+        views.coop_plan_job_status_api,
+        name="coop_plan_job_status_api"
+    ),
     path(
         "divisions/<int:division_id>/plan/history/",
         views.coop_plan_history,
         name="coop_plan_history"
     ),
+    path(
+        "plans/<int:pk>/download/<str:kind>/",
+        views.download_plan_artifact,
+        name="download_plan_artifact"
+    ),
 
     # -------------------------
     # Leadership Dashboard
@@ -1,18 +1,34 @@
+import os
+import re
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Count
+from django.http import (
+    FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+)
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+from django.views.decorators.http import condition
 from .models import (
     Division, EssentialFunction, CriticalApplication, KeyPersonnel,
     VitalRecord, Dependency, AlternateFacility, Communication,
-    RecoveryPriority, DivisionMetadata, GeneratedPlan
+    RecoveryPriority, DivisionMetadata, GeneratedPlan, ServiceNowIntegrationConfig
 )
 from .forms import (
     EssentialFunctionForm, CriticalApplicationForm, KeyPersonnelForm,
     VitalRecordForm, DependencyForm, AlternateFacilityForm,
     CommunicationForm, RecoveryPriorityForm, DivisionMetadataForm
 )
-from .services.coop_plan import generate_coop_plan_for_division
+from .dashboard import get_leadership_dashboard
+from .listing import keyset_paginate
+from .query_budget import query_budget
+from .request_division import get_division_or_404, get_item_division
+from .permissions import is_admin, is_coordinator, is_leadership
+from .plan_workflows import (
+    enqueue_coop_plan_generation, get_coop_plan_job, job_belongs_to_division
+)
 from .integrations.servicenow import sync_critical_applications_from_servicenow
 
 
@@ -22,15 +38,9 @@ from .integrations.servicenow import sync_critical_applications_from_servicenow
 
 def can_edit_division(user, division):
     """Admins can edit everything. Coordinators can edit their division only."""
-    if not user.is_authenticated:
-        return False
-    if user.is_superuser:
-        return True
-    if user.groups.filter(name="COOP Admins").exists():
-        return True
-    if user.groups.filter(name="Coordinators").exists() and division.coordinator == user:
+    if is_admin(user):
         return True
-    return False
+    return is_coordinator(user) and division.coordinator_id == user.pk
 
 
 # ---------------------------------------------------------
@@ -38,14 +48,16 @@ def can_edit_division(user, division):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(5)
 def division_list(request):
     divisions = Division.objects.all()
     return render(request, "divisions/list.html", {"divisions": divisions})
 
 
 @login_required
+@query_budget(5)
 def division_detail(request, pk):
-    division = get_object_or_404(Division, pk=pk)
+    division = get_division_or_404(request, pk)
     return render(request, "divisions/detail.html", {"division": division})
 
 
@@ -54,15 +66,17 @@ def division_detail(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(8)
 def essential_function_list(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     items = EssentialFunction.objects.filter(division=division)
-    return render(request, "essential_functions/list.html", {"division": division, "items": items})
+    page = keyset_paginate(request, items, division)
+    return render(request, "essential_functions/list.html", {"division": division, "items": page.items, "page": page})
 
 
 @login_required
 def essential_function_create(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
 
     if not can_edit_division(request.user, division):
         return redirect("essential_function_list", division_id=division.id)
@@ -83,7 +97,7 @@ def essential_function_create(request, division_id):
 @login_required
 def essential_function_edit(request, pk):
     item = get_object_or_404(EssentialFunction, pk=pk)
-    division = item.division
+    division = get_item_division(request, item)
 
     if not can_edit_division(request.user, division):
         return redirect("essential_function_list", division_id=division.id)
@@ -104,15 +118,17 @@ def essential_function_edit(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(8)
 def critical_application_list(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     items = CriticalApplication.objects.filter(division=division)
-    return render(request, "critical_applications/list.html", {"division": division, "items": items})
+    page = keyset_paginate(request, items, division)
+    return render(request, "critical_applications/list.html", {"division": division, "items": page.items, "page": page})
 
 
 @login_required
 def critical_application_create(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
 
     if not can_edit_division(request.user, division):
         return redirect("critical_application_list", division_id=division.id)
@@ -133,7 +149,7 @@ def critical_application_create(request, division_id):
 @login_required
 def critical_application_edit(request, pk):
     item = get_object_or_404(CriticalApplication, pk=pk)
-    division = item.division
+    division = get_item_division(request, item)
 
     if not can_edit_division(request.user, division):
         return redirect("critical_application_list", division_id=division.id)
@@ -154,20 +170,28 @@ def sync_critical_applications_servicenow(request, division_id):
     """
     Sync critical applications from ServiceNow for this division.
     """
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
 
     if not can_edit_division(request.user, division):
         messages.error(request, "You do not have permission to sync this division.")
         return redirect("critical_application_list", division_id=division.id)
 
-    # Optional: allow a query filter via GET or POST
-    query = request.GET.get("query") or None
-
-    summary = sync_critical_applications_from_servicenow(division, query=query)
+    # The division's own connection, table, filter and watermark, as in the
+    # sync_servicenow command and the durable sync workflow.
+    config = ServiceNowIntegrationConfig.objects.filter(division=division).first()
+    # A one-off query filter only applies without a config: a narrower query
+    # would move the watermark past, or delete, records outside it.
+    query = None if config else request.GET.get("query") or None
+
+    summary = sync_critical_applications_from_servicenow(division, query=query, config=config)
+    if config is not None:
+        config.last_sync = timezone.now()
+        config.save(update_fields=["last_sync"])
     messages.success(
         request,
         f"ServiceNow sync complete: {summary['created']} created, "
-        f"{summary['updated']} updated (total {summary['total']})."
+        f"{summary['updated']} updated, {summary['unchanged']} unchanged, "
+        f"{summary['deleted']} deleted (total {summary['total']})."
     )
     return redirect("critical_application_list", division_id=division.id)
 
@@ -177,15 +201,17 @@ def sync_critical_applications_servicenow(request, division_id):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(8)
 def key_personnel_list(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     items = KeyPersonnel.objects.filter(division=division)
-    return render(request, "key_personnel/list.html", {"division": division, "items": items})
+    page = keyset_paginate(request, items, division)
+    return render(request, "key_personnel/list.html", {"division": division, "items": page.items, "page": page})
 
 
 @login_required
 def key_personnel_create(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
 
     if not can_edit_division(request.user, division):
         return redirect("key_personnel_list", division_id=division.id)
@@ -206,7 +232,7 @@ def key_personnel_create(request, division_id):
 @login_required
 def key_personnel_edit(request, pk):
     item = get_object_or_404(KeyPersonnel, pk=pk)
-    division = item.division
+    division = get_item_division(request, item)
 
     if not can_edit_division(request.user, division):
         return redirect("key_personnel_list", division_id=division.id)
@@ -227,15 +253,17 @@ def key_personnel_edit(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(8)
 def vital_record_list(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     items = VitalRecord.objects.filter(division=division)
-    return render(request, "vital_records/list.html", {"division": division, "items": items})
+    page = keyset_paginate(request, items, division)
+    return render(request, "vital_records/list.html", {"division": division, "items": page.items, "page": page})
 
 
 @login_required
 def vital_record_create(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
 
     if not can_edit_division(request.user, division):
         return redirect("vital_record_list", division_id=division.id)
@@ -256,7 +284,7 @@ def vital_record_create(request, division_id):
 @login_required
 def vital_record_edit(request, pk):
     item = get_object_or_404(VitalRecord, pk=pk)
-    division = item.division
+    division = get_item_division(request, item)
 
     if not can_edit_division(request.user, division):
         return redirect("vital_record_list", division_id=division.id)
@@ -277,15 +305,17 @@ def vital_record_edit(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(8)
 def dependency_list(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     items = Dependency.objects.filter(division=division)
-    return render(request, "dependencies/list.html", {"division": division, "items": items})
+    page = keyset_paginate(request, items, division)
+    return render(request, "dependencies/list.html", {"division": division, "items": page.items, "page": page})
 
 
 @login_required
 def dependency_create(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
 
     if not can_edit_division(request.user, division):
         return redirect("dependency_list", division_id=division.id)
@@ -306,7 +336,7 @@ def dependency_create(request, division_id):
 @login_required
 def dependency_edit(request, pk):
     item = get_object_or_404(Dependency, pk=pk)
-    division = item.division
+    division = get_item_division(request, item)
 
     if not can_edit_division(request.user, division):
         return redirect("dependency_list", division_id=division.id)
@@ -327,15 +357,17 @@ def dependency_edit(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(8)
 def alternate_facility_list(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     items = AlternateFacility.objects.filter(division=division)
-    return render(request, "alternate_facilities/list.html", {"division": division, "items": items})
+    page = keyset_paginate(request, items, division)
+    return render(request, "alternate_facilities/list.html", {"division": division, "items": page.items, "page": page})
 
 
 @login_required
 def alternate_facility_create(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
 
     if not can_edit_division(request.user, division):
         return redirect("alternate_facility_list", division_id=division.id)
@@ -356,7 +388,7 @@ def alternate_facility_create(request, division_id):
 @login_required
 def alternate_facility_edit(request, pk):
     item = get_object_or_404(AlternateFacility, pk=pk)
-    division = item.division
+    division = get_item_division(request, item)
 
     if not can_edit_division(request.user, division):
         return redirect("alternate_facility_list", division_id=division.id)
@@ -377,15 +409,17 @@ def alternate_facility_edit(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(8)
 def communication_list(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     items = Communication.objects.filter(division=division)
-    return render(request, "communications/list.html", {"division": division, "items": items})
+    page = keyset_paginate(request, items, division)
+    return render(request, "communications/list.html", {"division": division, "items": page.items, "page": page})
 
 
 @login_required
 def communication_create(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
 
     if not can_edit_division(request.user, division):
         return redirect("communication_list", division_id=division.id)
@@ -406,7 +440,7 @@ def communication_create(request, division_id):
 @login_required
 def communication_edit(request, pk):
     item = get_object_or_404(Communication, pk=pk)
-    division = item.division
+    division = get_item_division(request, item)
 
     if not can_edit_division(request.user, division):
         return redirect("communication_list", division_id=division.id)
@@ -427,15 +461,17 @@ def communication_edit(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(8)
 def recovery_priority_list(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     items = RecoveryPriority.objects.filter(division=division)
-    return render(request, "recovery_priorities/list.html", {"division": division, "items": items})
+    page = keyset_paginate(request, items, division)
+    return render(request, "recovery_priorities/list.html", {"division": division, "items": page.items, "page": page})
 
 
 @login_required
 def recovery_priority_create(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
 
     if not can_edit_division(request.user, division):
         return redirect("recovery_priority_list", division_id=division.id)
@@ -456,7 +492,7 @@ def recovery_priority_create(request, division_id):
 @login_required
 def recovery_priority_edit(request, pk):
     item = get_object_or_404(RecoveryPriority, pk=pk)
-    division = item.division
+    division = get_item_division(request, item)
 
     if not can_edit_division(request.user, division):
         return redirect("recovery_priority_list", division_id=division.id)
@@ -477,15 +513,16 @@ def recovery_priority_edit(request, pk):
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(6)
 def division_metadata_detail(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     metadata = get_object_or_404(DivisionMetadata, division=division)
     return render(request, "division_metadata/detail.html", {"division": division, "metadata": metadata})
 
 
 @login_required
 def division_metadata_edit(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     metadata = get_object_or_404(DivisionMetadata, division=division)
 
     if not can_edit_division(request.user, division):
@@ -508,55 +545,205 @@ def division_metadata_edit(request, division_id):
 
 @login_required
 def generate_coop_plan_view(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
 
     if not can_edit_division(request.user, division):
         return redirect("division_detail", pk=division.id)
 
     if request.method == "POST":
-        result = generate_coop_plan_for_division(division.id)
-        return render(request, "coop_plan/generate_result.html", {"division": division, "result": result})
+        job_id = enqueue_coop_plan_generation(division.id, user_id=request.user.id)
+        return redirect("coop_plan_job_status", division_id=division.id, job_id=job_id)
 
     return redirect("division_detail", pk=division.id)
 
 
+def _get_division_plan_job(division, job_id):
+    if not job_belongs_to_division(job_id, division.id):
+        raise Http404("Unknown plan generation job.")
+    job = get_coop_plan_job(job_id)
+    if job is None:
+        raise Http404("Unknown plan generation job.")
+    return job
+
+
+@login_required
+def coop_plan_job_status(request, division_id, job_id):
+    """
+    Status page for a queued plan generation. Refreshes itself until the job
+    finishes, then shows the same result page the synchronous flow used to.
+    """
+    division = get_division_or_404(request, division_id)
+    job = _get_division_plan_job(division, job_id)
+
+    if job["result"] is not None:
+        plan_id = job["result"]["plan_id"]
+        result = {
+            "success": job["result"]["success"],
+            "plan": GeneratedPlan.objects.filter(pk=plan_id).first() if plan_id else None,
+            "reused": job["result"].get("reused", False),
+            "errors": job["result"]["errors"],
+        }
+        return render(request, "coop_plan/generate_results.html", {"division": division, "result": result})
+
+    return render(request, "coop_plan/job_status.html", {"division": division, "job": job})
+
+
+@login_required
+def coop_plan_job_status_api(request, division_id, job_id):
+    division = get_division_or_404(request, division_id)
+    return JsonResponse(_get_division_plan_job(division, job_id))
+
+
 # ---------------------------------------------------------
 # PLAN HISTORY
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(5)
 def coop_plan_history(request, division_id):
-    division = get_object_or_404(Division, pk=division_id)
+    division = get_division_or_404(request, division_id)
     plans = GeneratedPlan.objects.filter(division=division).order_by("-created_at")
     return render(request, "coop_plan/history.html", {"division": division, "plans": plans})
 
 
+# ---------------------------------------------------------
+# PLAN DOWNLOADS
+# ---------------------------------------------------------
+
+PLAN_ARTIFACT_CONTENT_TYPES = {
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pdf": "application/pdf",
+}
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _plan_artifact_etag(request, pk, kind):
+    # Artifacts never change after generation, so plan + kind + the data
+    # fingerprint identifies the bytes without touching the file.
+    plan = GeneratedPlan.objects.filter(pk=pk).only("pk", "fingerprint").first()
+    if plan is None or kind not in PLAN_ARTIFACT_CONTENT_TYPES:
+        return None
+    return f"{plan.pk}-{kind}-{plan.fingerprint}"
+
+
+def _requested_range(request, size, etag):
+    """
+    Returns (start, end) for a satisfiable single-range request, None to
+    serve the whole file, or False if the range cannot be satisfied.
+    """
+    header = request.headers.get("Range")
+    if not header:
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range.strip('"') != etag:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the final N bytes.
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _iter_file_range(path, start, length):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(_STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@login_required
+@condition(etag_func=_plan_artifact_etag)
+def download_plan_artifact(request, pk, kind):
+    """
+    Streams a generated plan's DOCX or PDF. Supports single byte ranges and
+    conditional GET; with COOP_PLAN_DOWNLOAD_OFFLOAD set, the transfer is
+    handed to the front-end server via X-Sendfile / X-Accel-Redirect.
+    """
+    if kind not in PLAN_ARTIFACT_CONTENT_TYPES:
+        raise Http404("Unknown plan artifact.")
+    plan = get_object_or_404(GeneratedPlan.objects.select_related("division"), pk=pk)
+    artifact = plan.docx_file if kind == "docx" else plan.pdf_file
+    if not artifact or not os.path.exists(artifact.path):
+        raise Http404("Plan file is missing.")
+
+    content_type = PLAN_ARTIFACT_CONTENT_TYPES[kind]
+    filename = f"COOP_Plan_{plan.division.name.replace(' ', '_')}_v{plan.version}.{kind}"
+    disposition = content_disposition_header(True, filename)
+
+    offload = getattr(settings, "COOP_PLAN_DOWNLOAD_OFFLOAD", "")
+    if offload:
+        response = HttpResponse(content_type=content_type)
+        if offload == "x-accel-redirect":
+            prefix = getattr(settings, "COOP_PLAN_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+            response["X-Accel-Redirect"] = prefix + artifact.name
+        else:
+            response["X-Sendfile"] = artifact.path
+        response["Content-Disposition"] = disposition
+        return response
+
+    size = os.path.getsize(artifact.path)
+    byte_range = _requested_range(request, size, _plan_artifact_etag(request, pk, kind))
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        response = FileResponse(
+            open(artifact.path, "rb"), as_attachment=True, filename=filename,
+            content_type=content_type,
+        )
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _iter_file_range(artifact.path, start, length),
+            status=206, content_type=content_type,
+        )
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Disposition"] = disposition
+
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = "private"
+    return response
+
+
 # ---------------------------------------------------------
 # LEADERSHIP DASHBOARD
 # ---------------------------------------------------------
 
 @login_required
+@query_budget(5)
 def leadership_dashboard(request):
     """
     Leadership dashboard showing overview of all divisions' readiness.
     Read-only view for Leadership role.
     """
     # Check if user has leadership access
-    if not (request.user.is_superuser or 
-            request.user.groups.filter(name__in=["Leadership", "COOP Admins"]).exists()):
+    if not (is_leadership(request.user) or is_admin(request.user)):
         return redirect("division_list")
     
-    # Aggregate division data
-    divisions = Division.objects.annotate(
-        essential_function_count=Count('essentialfunction'),
-        critical_application_count=Count('criticalapplication'),
-        key_personnel_count=Count('keypersonnel'),
-        vital_record_count=Count('vitalrecord')
-    ).select_related('coordinator')
-    
+    dashboard = get_leadership_dashboard()
     context = {
-        "divisions": divisions,
-        "total_divisions": divisions.count(),
+        "divisions": dashboard["divisions"],
+        "status_summary": dashboard["status_summary"],
     }
     
     return render(request, "dashboard/leadership.html", context)